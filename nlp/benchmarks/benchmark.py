@@ -0,0 +1,462 @@
+import gc
+import tracemalloc
+from argparse import ArgumentParser, Namespace
+from datetime import datetime, timezone
+from json import dumps, load
+from os import makedirs, replace
+from os.path import dirname, exists, join
+from pathlib import PurePath
+from platform import platform, python_version
+from subprocess import DEVNULL, CalledProcessError, check_output
+from time import perf_counter
+from typing import Callable, Dict, List, Tuple
+
+import numpy
+from gensim.models import KeyedVectors
+from numpy import ndarray
+
+from nlp.common.split import IndexedView
+from nlp.hw1 import hw1
+from nlp.hw2 import hw2
+from nlp.hw3 import hw3
+from nlp.hw4 import hw4
+
+# Total number of documents, split evenly between the two classes
+SCALES: Dict[str, int] = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+
+Benchmark = Tuple[str, Callable[[], object]]
+
+
+def createWords(count: int) -> ndarray:
+    """Returns count distinct lowercase words: a, b, ..., z, ba, bb, ..."""
+    words: List[str] = []
+
+    idx: int
+    for idx in range(count):
+        word: str = chr(ord("a") + idx % 26)
+        remainder: int = idx // 26
+        while remainder > 0:
+            word = chr(ord("a") + remainder % 26) + word
+            remainder //= 26
+        words.append(word)
+
+    return numpy.array(words, dtype=object)
+
+
+def generateDocuments(
+    filepath: str,
+    documentCount: int,
+    words: ndarray,
+    probabilities: ndarray,
+    meanLength: int = 20,
+    chunkSize: int = 100000,
+    seed: int = 42,
+) -> None:
+    """Writes documentCount lines of words drawn from probabilities to filepath
+
+    Document lengths are Poisson distributed around meanLength, and the file is
+    written chunkSize documents at a time.
+    """
+    rng: numpy.random.Generator = numpy.random.default_rng(seed)
+
+    with open(f"{filepath}.tmp", "w") as dataFile:
+        start: int
+        for start in range(0, documentCount, chunkSize):
+            lengths: ndarray = numpy.maximum(
+                rng.poisson(meanLength, size=min(chunkSize, documentCount - start)),
+                1,
+            )
+            tokens: ndarray = words[
+                rng.choice(words.shape[0], size=int(lengths.sum()), p=probabilities)
+            ]
+            ends: ndarray = numpy.cumsum(lengths)
+
+            dataFile.writelines(
+                " ".join(tokens[end - length : end]) + "\n"
+                for end, length in zip(ends.tolist(), lengths.tolist())
+            )
+        dataFile.close()
+
+    replace(f"{filepath}.tmp", filepath)
+
+
+def generateCorpus(
+    directory: str, documentCount: int, vocabularySize: int = 50000, seed: int = 42
+) -> Tuple[PurePath, PurePath]:
+    """Writes a synthetic positive and negative corpus unless it already exists
+
+    Both classes draw words from a Zipf distribution over the same vocabulary,
+    but the negative class shuffles the ranks of a tenth of the words so that
+    the classifiers have something to learn.
+    """
+    positivePath: PurePath = PurePath(join(directory, "positive"))
+    negativePath: PurePath = PurePath(join(directory, "negative"))
+    if exists(positivePath) and exists(negativePath):
+        return (positivePath, negativePath)
+
+    makedirs(directory, exist_ok=True)
+    rng: numpy.random.Generator = numpy.random.default_rng(seed)
+
+    words: ndarray = createWords(vocabularySize)
+    positiveProbabilities: ndarray = 1 / numpy.arange(1, vocabularySize + 1) ** 1.1
+    positiveProbabilities /= positiveProbabilities.sum()
+
+    negativeProbabilities: ndarray = positiveProbabilities.copy()
+    swapped: ndarray = rng.choice(
+        vocabularySize, size=vocabularySize // 10, replace=False
+    )
+    negativeProbabilities[swapped] = rng.permutation(negativeProbabilities[swapped])
+
+    print(f"Generating {documentCount:,} documents in {directory}...")
+    generateDocuments(
+        filepath=str(positivePath),
+        documentCount=documentCount // 2,
+        words=words,
+        probabilities=positiveProbabilities,
+        seed=seed + 1,
+    )
+    generateDocuments(
+        filepath=str(negativePath),
+        documentCount=documentCount - documentCount // 2,
+        words=words,
+        probabilities=negativeProbabilities,
+        seed=seed + 2,
+    )
+
+    return (positivePath, negativePath)
+
+
+def generateKeyedVectors(
+    vectorCount: int, vectorSize: int = 100, clusterCount: int = 1000, seed: int = 42
+) -> KeyedVectors:
+    """Returns clustered random vectors keyed by the words of createWords()"""
+    rng: numpy.random.Generator = numpy.random.default_rng(seed)
+    centers: ndarray = rng.standard_normal((clusterCount, vectorSize))
+    vectors: ndarray = centers[rng.integers(clusterCount, size=vectorCount)]
+    vectors += 0.5 * rng.standard_normal((vectorCount, vectorSize))
+
+    wv: KeyedVectors = KeyedVectors(vector_size=vectorSize)
+    wv.add_vectors(list(createWords(vectorCount)), vectors.astype(numpy.float32))
+    return wv
+
+
+def hw1Benchmarks(positivePath: PurePath, negativePath: PurePath) -> List[Benchmark]:
+    positiveTokens, positiveTest = hw1.tokenize(filepath=positivePath)
+    negativeTokens, negativeTest = hw1.tokenize(filepath=negativePath)
+
+    return [
+        (
+            "hw1.evaluate",
+            lambda: hw1.evaluate(
+                negativeTokens=negativeTokens,
+                positiveTokens=positiveTokens,
+                negativeTest=negativeTest,
+                positiveTest=positiveTest,
+            ),
+        )
+    ]
+
+
+def hw2Benchmarks(positivePath: PurePath, negativePath: PurePath) -> List[Benchmark]:
+    positiveTraining, _, positiveTesting = hw2.splitData(
+        hw2.loadData(filepath=positivePath)
+    )
+    negativeTraining, _, _ = hw2.splitData(hw2.loadData(filepath=negativePath))
+
+    positiveClassLog, negativeClassLog = hw2.computeDocumentFrequency(
+        positiveData=positiveTraining, negativeData=negativeTraining
+    )
+    classLikelihoods, vocabulary = hw2.trainNaiveBayes(
+        positiveTraining, negativeTraining
+    )
+
+    return [
+        (
+            "hw2.trainNaiveBayes",
+            lambda: hw2.trainNaiveBayes(positiveTraining, negativeTraining),
+        ),
+        (
+            "hw2.testNaiveBayes",
+            lambda: hw2.testNaiveBayes(
+                testingData=positiveTesting,
+                classLikelihoods=classLikelihoods,
+                vocabulary=vocabulary,
+                positiveClassLog=positiveClassLog,
+                negativeClassLog=negativeClassLog,
+            ),
+        ),
+    ]
+
+
+def hw3Benchmarks(
+    positivePath: PurePath, negativePath: PurePath, searchSize: int = 500
+) -> List[Benchmark]:
+    """The search runs on at most searchSize training rows, since SVC is quadratic"""
+    data: List[Tuple[IndexedView, IndexedView, IndexedView]] = hw3.splitData(
+        hw3.loadData(filepath=positivePath), hw3.loadData(filepath=negativePath)
+    )
+    vocabularyIndex: dict[str, int] = hw3.createVocabularyIndex(
+        set(hw3.createWordList(data[0][0])) | set(hw3.createWordList(data[1][0]))
+    )
+
+    def createDataset() -> Tuple[ndarray, ndarray]:
+        return hw3.createDataset(
+            positiveData=data[0][0],
+            negativeData=data[1][0],
+            vocabularyIndex=vocabularyIndex,
+            reducer=hw3.SparseReducer(numberOfComponents=100),
+            fitReducer=True,
+        )
+
+    trainingData, trainingLabels = createDataset()
+    searchRows: ndarray = numpy.random.default_rng(42).permutation(
+        trainingLabels.shape[0]
+    )[:searchSize]
+    parameterGrid: List[dict] = [
+        {"C": [0.1, 1.0], "kernel": ["linear"]},
+        {"C": [0.1, 1.0], "gamma": [0.01, 0.1], "kernel": ["rbf"]},
+    ]
+
+    def search(method: str) -> Callable[[], object]:
+        return lambda: hw3.createSearch(parameterGrid=parameterGrid, method=method).fit(
+            trainingData[searchRows], trainingLabels[searchRows]
+        )
+
+    return [
+        (
+            "hw3.termDocumentFrequency",
+            lambda: hw3.termDocumentFrequency(data[0][0], vocabularyIndex),
+        ),
+        ("hw3.createDataset", createDataset),
+        ("hw3.createSearch[grid]", search("grid")),
+        ("hw3.createSearch[halving]", search("halving")),
+    ]
+
+
+def hw4Benchmarks(
+    positivePath: PurePath, vectorCount: int = 100000, queryCount: int = 1000
+) -> List[Benchmark]:
+    corpus: hw4.MyCorpus = hw4.MyCorpus(corpusPath=str(positivePath))
+    hw4.preprocessCorpus(corpusPath=str(positivePath))
+
+    wv: KeyedVectors = generateKeyedVectors(vectorCount=vectorCount)
+    queries: List[str] = wv.index_to_key[:queryCount]
+    indexDirectory: str = f"{positivePath}.ivf"
+    index: hw4.IVFIndex = hw4.IVFIndex.build(
+        wv=wv, directory=indexDirectory, listCount=256
+    )
+
+    def iterateCorpus() -> int:
+        return sum([len(sentence) for sentence in corpus])
+
+    def searchIndex() -> None:
+        word: str
+        for word in queries:
+            index.search(wv[word], topN=10)
+
+    return [
+        ("hw4.MyCorpus", iterateCorpus),
+        (
+            "hw4.batchSimilarityQuery",
+            lambda: hw4.batchSimilarityQuery(words=queries, wv=wv, topN=10),
+        ),
+        ("hw4.IVFIndex.search", searchIndex),
+        (
+            "hw4.IVFIndex.build",
+            lambda: hw4.IVFIndex.build(wv=wv, directory=indexDirectory, listCount=256),
+        ),
+    ]
+
+
+def measure(name: str, function: Callable[[], object], repeat: int) -> dict:
+    """Times function repeat times, then runs it once more to trace its peak memory
+
+    Peak memory is the largest amount allocated through Python's allocators,
+    which includes NumPy arrays, at any point during the traced run.
+    """
+    seconds: List[float] = []
+
+    _: int
+    for _ in range(repeat):
+        gc.collect()
+        start: float = perf_counter()
+        function()
+        seconds.append(perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    function()
+    peakBytes: int = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    result: dict = {
+        "name": name,
+        "seconds": seconds,
+        "best": min(seconds),
+        "mean": float(numpy.mean(seconds)),
+        "peakBytes": peakBytes,
+    }
+    print(
+        f"{name:<30} best {result['best']:>10.4f}s   "
+        f"mean {result['mean']:>10.4f}s   peak {peakBytes / (1 << 20):>10.1f} MiB"
+    )
+
+    return result
+
+
+def currentCommit() -> str | None:
+    try:
+        return (
+            check_output(
+                ["git", "rev-parse", "HEAD"],
+                cwd=dirname(__file__) or ".",
+                stderr=DEVNULL,
+            )
+            .decode()
+            .strip()
+        )
+    except (CalledProcessError, FileNotFoundError):
+        return None
+
+
+def runBenchmarks(
+    scale: str, dataDirectory: str, repeat: int, names: List[str] | None
+) -> dict:
+    positivePath, negativePath = generateCorpus(
+        directory=join(dataDirectory, scale), documentCount=SCALES[scale]
+    )
+
+    suites: List[Callable[[], List[Benchmark]]] = [
+        lambda: hw1Benchmarks(positivePath, negativePath),
+        lambda: hw2Benchmarks(positivePath, negativePath),
+        lambda: hw3Benchmarks(positivePath, negativePath),
+        lambda: hw4Benchmarks(positivePath),
+    ]
+    suiteNames: List[str] = ["hw1", "hw2", "hw3", "hw4"]
+
+    results: List[dict] = []
+
+    suiteName: str
+    for suiteName, suite in zip(suiteNames, suites):
+        if names is not None and not any(
+            name.startswith(suiteName) or suiteName.startswith(name) for name in names
+        ):
+            continue
+
+        print(f"Setting up {suiteName}...")
+        for name, function in suite():
+            if names is None or any(name.startswith(prefix) for prefix in names):
+                results.append(measure(name=name, function=function, repeat=repeat))
+
+    return {
+        "commit": currentCommit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": python_version(),
+        "platform": platform(),
+        "scale": scale,
+        "documents": SCALES[scale],
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compareResults(baselinePath: str, candidatePath: str) -> None:
+    """Prints the ratio of the candidate's best time and peak memory to the baseline's"""
+    with open(baselinePath, "r") as baselineFile:
+        baseline: dict = load(baselineFile)
+        baselineFile.close()
+
+    with open(candidatePath, "r") as candidateFile:
+        candidate: dict = load(candidateFile)
+        candidateFile.close()
+
+    baselineResults: Dict[str, dict] = {
+        result["name"]: result for result in baseline["results"]
+    }
+
+    print(f"{'benchmark':<30} {'time':>10} {'memory':>10}")
+    result: dict
+    for result in candidate["results"]:
+        if result["name"] not in baselineResults:
+            continue
+
+        before: dict = baselineResults[result["name"]]
+        timeRatio: float = result["best"] / before["best"]
+        memoryRatio: float = result["peakBytes"] / max(before["peakBytes"], 1)
+        print(f"{result['name']:<30} {timeRatio:>9.2f}x {memoryRatio:>9.2f}x")
+
+
+def getArgs() -> Namespace:
+    parser: ArgumentParser = ArgumentParser(
+        prog="COMP 429 NLP Benchmarks",
+        usage="Benchmarks the hot paths of the homework solutions",
+        epilog="Written by Nicholas M. Synovic",
+    )
+    parser.add_argument(
+        "--scale",
+        type=str,
+        choices=list(SCALES),
+        default="10k",
+        help="Number of synthetic documents to benchmark with (default: 10k)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Number of timed runs of each benchmark (default: 3)",
+    )
+    parser.add_argument(
+        "--benchmarks",
+        type=str,
+        nargs="+",
+        help="Only run benchmarks whose names start with one of these prefixes",
+    )
+    parser.add_argument(
+        "--data-directory",
+        type=str,
+        default="data",
+        help="Directory to generate and reuse synthetic corpora in (default: data)",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        help="JSON file to save results to (default: results/<scale>-<commit>.json)",
+    )
+    parser.add_argument(
+        "--compare",
+        type=str,
+        nargs=2,
+        metavar=("BASELINE", "CANDIDATE"),
+        help="Compare two result files instead of running benchmarks",
+    )
+
+    return parser.parse_args()
+
+
+def main() -> None:
+    args: Namespace = getArgs()
+
+    if args.compare is not None:
+        compareResults(baselinePath=args.compare[0], candidatePath=args.compare[1])
+        return
+
+    results: dict = runBenchmarks(
+        scale=args.scale,
+        dataDirectory=args.data_directory,
+        repeat=args.repeat,
+        names=args.benchmarks,
+    )
+
+    outputPath: str = args.output or join(
+        "results", f"{args.scale}-{(results['commit'] or 'unknown')[:12]}.json"
+    )
+    makedirs(PurePath(outputPath).parent, exist_ok=True)
+    with open(outputPath, "w") as outputFile:
+        outputFile.write(dumps(obj=results, indent=4))
+        outputFile.close()
+
+    print(f"Saved results to {outputPath}")
+
+
+if __name__ == "__main__":
+    main()
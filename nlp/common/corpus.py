@@ -0,0 +1,152 @@
+from mmap import ACCESS_READ, mmap
+from os import remove, replace
+from os.path import exists, getmtime, getsize
+from pathlib import PurePath
+from typing import Iterator, List, Sequence, Tuple
+
+import numpy
+from numpy import ndarray
+
+from nlp.common.split import IndexedView
+
+
+def buildLineIndex(filepath: PurePath, blockSize: int = 1 << 26) -> ndarray:
+    """Returns the byte offset of the start of every line, followed by the file size
+
+    Line i is the bytes from offsets[i] up to offsets[i + 1], including its
+    newline. The file is scanned blockSize bytes at a time.
+    """
+    parts: List[ndarray] = [numpy.zeros(1, dtype=numpy.uint64)]
+    position: int = 0
+
+    with open(filepath, "rb") as dataFile:
+        while block := dataFile.read(blockSize):
+            newlines: ndarray = numpy.flatnonzero(
+                numpy.frombuffer(block, dtype=numpy.uint8) == ord("\n")
+            )
+            parts.append(newlines.astype(numpy.uint64) + numpy.uint64(position + 1))
+            position += len(block)
+        dataFile.close()
+
+    offsets: ndarray = numpy.concatenate(parts)
+    if int(offsets[-1]) != position:
+        offsets = numpy.append(offsets, numpy.uint64(position))
+
+    return offsets
+
+
+def loadLineIndex(filepath: PurePath, indexPath: PurePath | None = None) -> ndarray:
+    """Returns the memory-mapped line index of a file, building it if it is stale
+
+    The index is saved to indexPath, by default the file's path with an
+    .offsets.npy suffix, and rebuilt when it is older than the file or does
+    not end at the file's size. If the index cannot be saved, for example because
+    the file is on a read-only file system, the index is kept in memory instead.
+    """
+    indexPath = str(indexPath or f"{filepath}.offsets.npy")
+
+    if exists(indexPath) and getmtime(indexPath) >= getmtime(filepath):
+        offsets: ndarray = numpy.load(indexPath, mmap_mode="r")
+        if int(offsets[-1]) == getsize(filepath):
+            return offsets
+
+    offsets = buildLineIndex(filepath)
+
+    try:
+        with open(f"{indexPath}.tmp", "wb") as indexFile:
+            numpy.save(indexFile, offsets)
+            indexFile.close()
+
+        replace(f"{indexPath}.tmp", indexPath)
+    except OSError:
+        if exists(f"{indexPath}.tmp"):
+            remove(f"{indexPath}.tmp")
+        return offsets
+
+    return numpy.load(indexPath, mmap_mode="r")
+
+
+class Corpus(Sequence):
+    """A memory-mapped text file that is indexed by line
+
+    Lines are decoded as UTF-8 and keep their newline, like readlines(). Getting
+    a line is O(1) through the line index from loadLineIndex(), and indexing with
+    a slice or an index array returns an IndexedView of the lines. A Corpus is
+    pickled as its path, so worker processes map the same file rather than
+    receiving a copy of it.
+    """
+
+    def __init__(self, filepath: PurePath, indexPath: PurePath | None = None) -> None:
+        self.filepath: PurePath = filepath
+        self.indexPath: PurePath | None = indexPath
+        self.offsets: ndarray = loadLineIndex(filepath=filepath, indexPath=indexPath)
+
+        self.buffer: mmap | bytes = b""
+        if getsize(filepath) > 0:
+            with open(filepath, "rb") as dataFile:
+                self.buffer = mmap(dataFile.fileno(), 0, access=ACCESS_READ)
+                dataFile.close()
+
+    def __reduce__(self) -> Tuple[type, Tuple[PurePath, PurePath | None]]:
+        return (Corpus, (self.filepath, self.indexPath))
+
+    def __len__(self) -> int:
+        return self.offsets.shape[0] - 1
+
+    def __getitem__(self, key: int | slice | ndarray) -> str | IndexedView:
+        if not isinstance(key, (int, numpy.integer)):
+            return IndexedView(data=self, indices=numpy.arange(len(self))[key])
+
+        idx: int = int(key) + len(self) if key < 0 else int(key)
+        if not 0 <= idx < len(self):
+            raise IndexError(f"Line {key} is out of range")
+
+        start, end = self.byteRange(idx, idx + 1)
+        return self.buffer[start:end].decode(encoding="UTF-8")
+
+    def __iter__(self) -> Iterator[str]:
+        return self.lines(0, len(self))
+
+    def byteRange(self, start: int, stop: int) -> Tuple[int, int]:
+        """Returns the byte offsets of lines [start, stop)"""
+        return (int(self.offsets[start]), int(self.offsets[stop]))
+
+    def view(self, start: int, stop: int) -> memoryview:
+        """Returns the bytes of lines [start, stop) without copying them"""
+        byteStart, byteEnd = self.byteRange(start, stop)
+        return memoryview(self.buffer)[byteStart:byteEnd]
+
+    def lines(self, start: int, stop: int, blockSize: int = 1 << 16) -> Iterator[str]:
+        """Yields lines [start, stop), decoding blockSize lines at a time"""
+        blockStart: int
+        for blockStart in range(start, stop, blockSize):
+            byteStart, byteEnd = self.byteRange(
+                blockStart, min(blockStart + blockSize, stop)
+            )
+            pieces: List[str] = (
+                self.buffer[byteStart:byteEnd].decode(encoding="UTF-8").split("\n")
+            )
+
+            piece: str
+            for piece in pieces[:-1]:
+                yield f"{piece}\n"
+
+            if pieces[-1] != "":
+                yield pieces[-1]
+
+    def shards(self, shardCount: int) -> List[Tuple[int, int]]:
+        """Splits the lines into at most shardCount ranges of similar byte size"""
+        fileSize: int = int(self.offsets[-1])
+        targets: ndarray = numpy.array(
+            [fileSize * idx // shardCount for idx in range(1, shardCount)],
+            dtype=numpy.uint64,
+        )
+        boundaries: List[int] = (
+            [0] + numpy.searchsorted(self.offsets, targets).tolist() + [len(self)]
+        )
+
+        return [
+            (start, stop)
+            for start, stop in zip(boundaries, boundaries[1:])
+            if start < stop
+        ]
@@ -0,0 +1,145 @@
+from hashlib import sha256
+from json import dumps, load
+from os import remove, replace
+from os.path import exists, getsize
+from pathlib import PurePath
+from typing import Callable, Dict
+
+from requests import Response, get
+
+# Sends a GET request for a URL with the given headers and returns the response,
+# whose body is read with iter_content()
+Transport = Callable[[str, Dict[str, str]], Response]
+
+
+def requestsTransport(url: str, headers: Dict[str, str]) -> Response:
+    return get(url, headers=headers, stream=True, timeout=60)
+
+
+def readMetadata(metadataPath: str) -> dict:
+    if not exists(metadataPath):
+        return {}
+
+    with open(metadataPath, "r") as metadataFile:
+        metadata: dict = load(metadataFile)
+        metadataFile.close()
+
+    return metadata
+
+
+def writeMetadata(metadataPath: str, metadata: dict) -> None:
+    with open(f"{metadataPath}.tmp", "w") as metadataFile:
+        metadataFile.write(dumps(obj=metadata, indent=4))
+        metadataFile.close()
+
+    replace(f"{metadataPath}.tmp", metadataPath)
+
+
+def fileDigest(filepath: str, chunkSize: int = 1 << 20) -> str:
+    """Returns the hex SHA-256 digest of a file"""
+    digest = sha256()
+
+    with open(filepath, "rb") as dataFile:
+        while chunk := dataFile.read(chunkSize):
+            digest.update(chunk)
+        dataFile.close()
+
+    return digest.hexdigest()
+
+
+def download(
+    url: str,
+    filepath: PurePath,
+    checksum: str | None = None,
+    transport: Transport = requestsTransport,
+    chunkSize: int = 1 << 16,
+) -> bool:
+    """Downloads url to filepath unless the local copy is current
+
+    Returns whether the file was downloaded. The ETag, Last-Modified date, and
+    SHA-256 digest of the download are kept in filepath.download.json. When
+    checksum is given and matches the local file the network is not used at
+    all. Otherwise the request is conditional on the saved ETag and Last-Modified
+    date, and nothing is downloaded if the server answers 304 Not Modified. The
+    request is only conditional if the local file still has the saved digest, so
+    a corrupted copy is downloaded again.
+
+    The body is streamed in chunkSize pieces to filepath.part, which only
+    replaces filepath once it is complete and its digest matches checksum. An
+    interrupted download is resumed with a Range request if the server still
+    has the same version of the file. transport sends the requests, and can be
+    replaced to fetch from somewhere other than the network.
+    """
+    filepath = str(filepath)
+    metadataPath: str = f"{filepath}.download.json"
+    partPath: str = f"{filepath}.part"
+
+    metadata: dict = readMetadata(metadataPath)
+    if metadata.get("url") != url:
+        metadata = {}
+
+    localDigest: str | None = fileDigest(filepath) if exists(filepath) else None
+    if localDigest is not None and localDigest == checksum:
+        return False
+
+    if localDigest is None or localDigest != metadata.get("sha256"):
+        metadata.pop("etag", None)
+        metadata.pop("lastModified", None)
+
+    headers: Dict[str, str] = {}
+    if "etag" in metadata:
+        headers["If-None-Match"] = metadata["etag"]
+    if "lastModified" in metadata:
+        headers["If-Modified-Since"] = metadata["lastModified"]
+
+    offset: int = 0
+    if exists(partPath) and metadata.get("partialETag"):
+        offset = getsize(partPath)
+        headers["Range"] = f"bytes={offset}-"
+        headers["If-Range"] = metadata["partialETag"]
+
+    digest = sha256()
+    response: Response
+    with transport(url, headers) as response:
+        if response.status_code == 304:
+            return False
+
+        response.raise_for_status()
+        if response.status_code != 206:
+            offset = 0
+
+        metadata["url"] = url
+        metadata["partialETag"] = response.headers.get("ETag")
+        writeMetadata(metadataPath, metadata)
+
+        if offset > 0:
+            with open(partPath, "rb") as partFile:
+                while chunk := partFile.read(chunkSize):
+                    digest.update(chunk)
+                partFile.close()
+
+        with open(partPath, "ab" if offset > 0 else "wb") as partFile:
+            chunk: bytes
+            for chunk in response.iter_content(chunk_size=chunkSize):
+                partFile.write(chunk)
+                digest.update(chunk)
+            partFile.close()
+
+        lastModified: str | None = response.headers.get("Last-Modified")
+
+    if checksum is not None and digest.hexdigest() != checksum:
+        remove(partPath)
+        raise ValueError(
+            f"{url} has SHA-256 {digest.hexdigest()}, which does not match {checksum}"
+        )
+
+    replace(partPath, filepath)
+
+    metadata = {"url": url, "sha256": digest.hexdigest()}
+    if response.headers.get("ETag") is not None:
+        metadata["etag"] = response.headers["ETag"]
+    if lastModified is not None:
+        metadata["lastModified"] = lastModified
+    writeMetadata(metadataPath, metadata)
+
+    return True
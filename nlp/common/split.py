@@ -0,0 +1,120 @@
+from math import fsum
+from typing import Iterator, List, Sequence, Tuple
+
+import numpy
+from numpy import ndarray
+
+
+class IndexedView(Sequence):
+    """The items of data at indices, without copying them
+
+    Indexing with an int returns an item, and indexing with a slice or an
+    index array returns another view of the same data.
+    """
+
+    def __init__(self, data: Sequence, indices: ndarray) -> None:
+        self.data: Sequence = data
+        self.indices: ndarray = indices
+
+    def __len__(self) -> int:
+        return self.indices.shape[0]
+
+    def __getitem__(self, key: int | slice | ndarray) -> object:
+        if isinstance(key, (int, numpy.integer)):
+            return self.data[int(self.indices[key])]
+        return IndexedView(data=self.data, indices=self.indices[key])
+
+    def __iter__(self) -> Iterator:
+        idx: int
+        for idx in self.indices.tolist():
+            yield self.data[idx]
+
+
+def splitIndices(
+    size: int,
+    fractions: Tuple[float, ...] = (0.7, 0.15, 0.15),
+    shuffle: bool = True,
+    seed: int = 42,
+) -> List[ndarray]:
+    """Splits range(size) into len(fractions) index arrays
+
+    Split i ends at floor(size * (fractions[0] + ... + fractions[i])), and the
+    last split ends at size, so every index is in exactly one split. The
+    fractions must sum to 1. Without shuffle the splits are contiguous ranges.
+    """
+    if abs(fsum(fractions) - 1) > 1e-9:
+        raise ValueError(f"Split fractions must sum to 1, not {fsum(fractions)}")
+
+    indices: ndarray = numpy.arange(size, dtype=numpy.int64)
+    if shuffle:
+        indices = numpy.random.default_rng(seed).permutation(indices)
+
+    boundaries: ndarray = numpy.floor(numpy.cumsum(fractions[:-1]) * size)
+    return numpy.split(indices, boundaries.astype(numpy.int64))
+
+
+def stratifiedSplit(
+    labels: ndarray,
+    fractions: Tuple[float, ...] = (0.7, 0.15, 0.15),
+    shuffle: bool = True,
+    seed: int = 42,
+) -> List[ndarray]:
+    """Splits the indices of labels so that every split has the same class ratios
+
+    Each class is split with splitIndices(). Without shuffle each split is in
+    ascending order, otherwise it is shuffled. The same labels and seed always
+    give the same splits.
+    """
+    labels = numpy.asarray(labels)
+    rng: numpy.random.Generator = numpy.random.default_rng(seed)
+    splits: List[List[ndarray]] = [[] for _ in fractions]
+
+    label: object
+    for label in numpy.unique(labels):
+        members: ndarray = numpy.flatnonzero(labels == label)
+        memberSplits: List[ndarray] = splitIndices(
+            size=members.shape[0],
+            fractions=fractions,
+            shuffle=shuffle,
+            seed=int(rng.integers(1 << 31)),
+        )
+
+        idx: int
+        for idx, memberSplit in enumerate(memberSplits):
+            splits[idx].append(members[memberSplit])
+
+    results: List[ndarray] = []
+    split: List[ndarray]
+    for split in splits:
+        indices: ndarray = numpy.concatenate(split or [numpy.empty(0, numpy.int64)])
+        results.append(rng.permutation(indices) if shuffle else numpy.sort(indices))
+
+    return results
+
+
+def stratifiedKFold(
+    labels: ndarray, folds: int = 10, shuffle: bool = True, seed: int = 42
+) -> List[Tuple[ndarray, ndarray]]:
+    """Returns (training, testing) index arrays for each of folds folds
+
+    Each class is divided into folds nearly equal parts, and fold i tests on
+    part i of every class and trains on the rest.
+    """
+    labels = numpy.asarray(labels)
+    rng: numpy.random.Generator = numpy.random.default_rng(seed)
+    parts: List[List[ndarray]] = [[] for _ in range(folds)]
+
+    label: object
+    for label in numpy.unique(labels):
+        members: ndarray = numpy.flatnonzero(labels == label)
+        if shuffle:
+            members = rng.permutation(members)
+
+        idx: int
+        for idx, part in enumerate(numpy.array_split(members, folds)):
+            parts[idx].append(part)
+
+    testing: List[ndarray] = [numpy.sort(numpy.concatenate(part)) for part in parts]
+    return [
+        (numpy.setdiff1d(numpy.arange(labels.shape[0]), fold), fold) for fold in testing
+    ]
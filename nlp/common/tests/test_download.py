@@ -0,0 +1,114 @@
+from hashlib import sha256
+from io import BytesIO
+from json import load
+from pathlib import Path
+from typing import Dict, List
+
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+
+from nlp.common.download import download
+
+URL: str = "https://example.com/data"
+
+
+class LocalServer:
+    """A transport that serves one file from memory and records every request
+
+    It answers conditional requests with 304 Not Modified when the ETag matches,
+    and Range requests with 206 Partial Content when If-Range matches the ETag.
+    """
+
+    def __init__(self, body: bytes, etag: str | None = '"v1"') -> None:
+        self.body: bytes = body
+        self.etag: str | None = etag
+        self.requests: List[Dict[str, str]] = []
+
+    def __call__(self, url: str, headers: Dict[str, str]) -> Response:
+        self.requests.append(dict(headers))
+
+        response: Response = Response()
+        response.url = url
+        response.headers = CaseInsensitiveDict()
+        if self.etag is not None:
+            response.headers["ETag"] = self.etag
+
+        body: bytes = self.body
+        response.status_code = 200
+        if self.etag is not None and headers.get("If-None-Match") == self.etag:
+            response.status_code = 304
+            body = b""
+        elif "Range" in headers and headers.get("If-Range") == self.etag:
+            start: int = int(headers["Range"][len("bytes=") : -1])
+            response.status_code = 206
+            body = self.body[start:]
+
+        response.raw = BytesIO(body)
+        return response
+
+
+def test_download_fetches_file_and_saves_metadata(tmp_path: Path) -> None:
+    filepath: Path = tmp_path / "data"
+    server: LocalServer = LocalServer(body=b"line one\nline two\n")
+
+    assert download(URL, filepath, transport=server)
+    assert filepath.read_bytes() == server.body
+    assert server.requests == [{}]
+
+    with open(f"{filepath}.download.json") as metadataFile:
+        metadata: dict = load(metadataFile)
+    assert metadata["etag"] == '"v1"'
+    assert metadata["sha256"] == sha256(server.body).hexdigest()
+
+
+def test_download_skips_unmodified_file(tmp_path: Path) -> None:
+    filepath: Path = tmp_path / "data"
+    server: LocalServer = LocalServer(body=b"line one\nline two\n")
+
+    download(URL, filepath, transport=server)
+
+    assert not download(URL, filepath, transport=server)
+    assert server.requests[-1] == {"If-None-Match": '"v1"'}
+    assert filepath.read_bytes() == server.body
+
+
+def test_download_replaces_corrupted_file(tmp_path: Path) -> None:
+    filepath: Path = tmp_path / "data"
+    server: LocalServer = LocalServer(body=b"line one\nline two\n")
+
+    download(URL, filepath, transport=server)
+    filepath.write_bytes(b"garbage")
+
+    assert download(URL, filepath, transport=server)
+    assert "If-None-Match" not in server.requests[-1]
+    assert filepath.read_bytes() == server.body
+
+
+def test_download_resumes_partial_file(tmp_path: Path) -> None:
+    filepath: Path = tmp_path / "data"
+    server: LocalServer = LocalServer(body=b"line one\nline two\n")
+
+    Path(f"{filepath}.part").write_bytes(server.body[:5])
+    Path(f"{filepath}.download.json").write_text(
+        f'{{"url": "{URL}", "partialETag": "\\"v1\\""}}'
+    )
+
+    assert download(
+        URL, filepath, checksum=sha256(server.body).hexdigest(), transport=server
+    )
+    assert server.requests[-1] == {"Range": "bytes=5-", "If-Range": '"v1"'}
+    assert filepath.read_bytes() == server.body
+
+
+def test_download_restarts_partial_file_without_etag(tmp_path: Path) -> None:
+    filepath: Path = tmp_path / "data"
+    server: LocalServer = LocalServer(body=b"line one\nline two\n", etag=None)
+
+    Path(f"{filepath}.part").write_bytes(b"old p")
+    Path(f"{filepath}.download.json").write_text(
+        f'{{"url": "{URL}", "partialETag": null}}'
+    )
+
+    assert download(URL, filepath, transport=server)
+    assert server.requests[-1] == {}
+    assert filepath.read_bytes() == server.body
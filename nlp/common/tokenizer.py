@@ -0,0 +1,79 @@
+import re
+from functools import lru_cache
+from pathlib import PurePath
+from re import Pattern
+from typing import Callable, Iterator, List, Tuple
+
+# Runs of word characters other than digits and underscores that are bounded by
+# spaces or the ends of the line. Outside of ASCII this also matches numerals
+# such as "²" and "½", so Tokenizer checks the tokens with str.isalpha()
+WORD_PATTERN: Pattern = re.compile(r"(?<![^ ])[^\W\d_]+(?![^ ])")
+
+# The same tokens as str.split(" "), including the empty token between two
+# spaces and at either end of the line next to a space
+SPLIT_PATTERN: Pattern = re.compile(r"(?<![^ ])[^ ]*")
+
+
+class Tokenizer:
+    """Tokenizes lines with a single compiled regular expression
+
+    By default lines are stripped, only tokens made up entirely of letters
+    (str.isalpha()) are kept, and they are lowercased. This is the same as
+    splitting on spaces and lowercasing each alphabetic token. When cacheSize
+    is greater than 0, the tokens of the most recently seen lines are kept in
+    an LRU cache so that repeated lines are not tokenized twice.
+    """
+
+    def __init__(
+        self,
+        pattern: Pattern = WORD_PATTERN,
+        lowercase: bool = True,
+        strip: bool = True,
+        lettersOnly: bool = True,
+        cacheSize: int = 0,
+    ) -> None:
+        self.pattern: Pattern = pattern
+        self.lowercase: bool = lowercase
+        self.strip: bool = strip
+        self.lettersOnly: bool = lettersOnly
+
+        self.tokenize: Callable[[str], Tuple[str, ...]] = self.tokenizeLine
+        if cacheSize > 0:
+            self.tokenize = lru_cache(maxsize=cacheSize)(self.tokenizeLine)
+
+    def __call__(self, line: str) -> Tuple[str, ...]:
+        return self.tokenize(line)
+
+    def tokenizeLine(self, line: str) -> Tuple[str, ...]:
+        if self.strip:
+            line = line.strip()
+
+        # WORD_PATTERN only matches letters in ASCII, and lowercasing an ASCII line
+        # cannot change which tokens match, so the whole line is handled at once
+        if self.pattern is WORD_PATTERN and line.isascii():
+            return tuple(self.pattern.findall(line.lower() if self.lowercase else line))
+
+        tokens: List[str] = self.pattern.findall(line)
+        if self.lettersOnly:
+            tokens = [token for token in tokens if token.isalpha()]
+        if self.lowercase:
+            tokens = [token.lower() for token in tokens]
+
+        return tuple(tokens)
+
+    def normalize(self, line: str) -> str:
+        """Returns the tokens of a line joined by single spaces"""
+        return " ".join(self.tokenize(line))
+
+    def stream(self, filepath: PurePath) -> Iterator[Tuple[str, ...]]:
+        """Yields the tokens of each line of a file without reading it into memory"""
+        line: str
+        with open(filepath, "r") as dataFile:
+            for line in dataFile:
+                yield self.tokenize(line)
+
+    def streamDocuments(self, filepath: PurePath) -> Iterator[str]:
+        """Yields each line of a file as a normalized document"""
+        tokens: Tuple[str, ...]
+        for tokens in self.stream(filepath):
+            yield " ".join(tokens)
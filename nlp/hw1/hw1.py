@@ -1,86 +1,135 @@
+from array import array
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
 from math import floor
 from pathlib import PurePath
-from typing import List, Tuple
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
 
-from requests import Response, get
+from nlp.common.corpus import Corpus
+from nlp.common.download import download
+from nlp.common.tokenizer import SPLIT_PATTERN, Tokenizer
 
+tokenizer: Tokenizer = Tokenizer(
+    pattern=SPLIT_PATTERN, lowercase=False, strip=False, lettersOnly=False
+)
 
-def downloadData(url: str, filepath: PurePath) -> None:
-    resp: Response = get(url)
 
-    text: str = resp.content.decode(encoding="UTF-8")
-    lines: List[str] = text.split(sep="\n")
-    lines = [f"{line}\n" for line in lines]
+def tokenize(filepath: PurePath) -> Tuple[List[str], Sequence[str]]:
+    """Returns the types of the first 60% of lines and a view of the other 40%"""
+    tokens: set[str] = set()
 
-    with open(file=filepath, mode="w") as sentiment:
-        sentiment.writelines(lines)
-        sentiment.close()
+    corpus: Corpus = Corpus(filepath=filepath)
+    sixtyPercent: int = floor(len(corpus) * 0.6)
 
+    line: str
+    for line in corpus.lines(0, sixtyPercent):
+        tokens.update(tokenizer(line))
 
-def tokenize(filepath: PurePath) -> Tuple[List[str], List[str]]:
-    tokens: List[str] = []
-    with open(file=filepath, mode="r") as sentiment:
-        lines: List[str] = sentiment.readlines()
-        sentiment.close()
+    return (list(tokens), corpus[sixtyPercent:])
 
-    size: int = len(lines)
-    sixtyPercent: float = floor(size * 0.6)
 
-    line: str
-    for line in lines[0:sixtyPercent]:
-        foo: List[str] = line.split(sep=" ")
-        tokens.extend(foo)
+class Lexicon:
+    """The positive and negative training types compiled into one lookup
 
-    tokens: set[str] = set(tokens)
-    tokens: List[str] = list(tokens)
+    A type that is only positive has a polarity of 1 and one that is only
+    negative has a polarity of -1. Types that are both cancel out and are left
+    out. The score of a document is the sum of the polarities of its types,
+    which is the number of positive types in it minus the number of negative
+    types.
+    """
 
-    return (tokens, lines[sixtyPercent::])
+    def __init__(self, positiveTokens: Iterable[str], negativeTokens: Iterable[str]):
+        positive: set[str] = set(positiveTokens)
+        negative: set[str] = set(negativeTokens)
 
+        self.polarity: Dict[str, int] = dict.fromkeys(positive - negative, 1)
+        self.polarity.update(dict.fromkeys(negative - positive, -1))
 
-def evaluate(
-    negativeTokens: List[str],
-    positiveTokens: List[str],
-    negativeTest: List[str],
-    positiveTest: List[str],
-) -> Tuple[float, float, float, float]:
+    @classmethod
+    def fromPolarity(cls, polarity: Dict[str, int]) -> "Lexicon":
+        lexicon: Lexicon = cls(positiveTokens=[], negativeTokens=[])
+        lexicon.polarity = polarity
+        return lexicon
+
+    def score(self, document: str) -> int:
+        polarity: Dict[str, int] = self.polarity
+        return sum([polarity.get(token, 0) for token in set(tokenizer(document))])
+
+    def scoreDocuments(
+        self, documents: Iterable[str], workers: int = 1, chunkSize: int = 10000
+    ) -> array:
+        """Scores a stream of documents, in worker processes when workers > 1
+
+        Documents are sent to the workers chunkSize at a time, with at most two
+        chunks per worker in flight, so memory does not grow with the input.
+        """
+        if workers <= 1:
+            return array("i", map(self.score, documents))
+
+        scores: array = array("i")
+        pending: deque[Future] = deque()
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=initLexiconWorker,
+            initargs=(self.polarity,),
+        ) as executor:
+            chunk: List[str]
+            for chunk in chunkDocuments(documents, chunkSize):
+                pending.append(executor.submit(scoreChunk, chunk))
+                if len(pending) > 2 * workers:
+                    scores.extend(pending.popleft().result())
 
-    tpLines: List[str] = []
-    fpLines: List[str] = []
-    tnLines: List[str] = []
-    fnLines: List[str] = []
+            while len(pending) > 0:
+                scores.extend(pending.popleft().result())
 
-    test: str
-    for test in positiveTest:
-        splitTest: List[str] = test.split(sep=" ")
-        testSet: set[str] = set(splitTest)
+        return scores
 
-        tpTest: List[str] = set(positiveTokens) & testSet
-        fpTest: List[str] = set(negativeTokens) & testSet
 
-        if len(tpTest) > len(fpTest):
-            tpLines.append(test)
-        else:
-            fpLines.append(test)
+workerLexicon: Lexicon | None = None
 
-    for test in negativeTest:
-        splitTest: List[str] = test.split(sep=" ")
-        testSet: set[str] = set(splitTest)
 
-        tnTest: List[str] = set(negativeTokens) & testSet
-        fnTest: List[str] = set(positiveTokens) & testSet
+def chunkDocuments(documents: Iterable[str], chunkSize: int) -> Iterator[List[str]]:
+    iterator: Iterator[str] = iter(documents)
+    while chunk := list(islice(iterator, chunkSize)):
+        yield chunk
+
+
+def initLexiconWorker(polarity: Dict[str, int]) -> None:
+    """Builds the lexicon once per worker process"""
+    global workerLexicon
+    workerLexicon = Lexicon.fromPolarity(polarity)
+
+
+def scoreChunk(documents: List[str]) -> array:
+    return array("i", map(workerLexicon.score, documents))
+
+
+def evaluate(
+    negativeTokens: List[str],
+    positiveTokens: List[str],
+    negativeTest: Iterable[str],
+    positiveTest: Iterable[str],
+    workers: int = 1,
+) -> Tuple[float, float, float, float]:
+    lexicon: Lexicon = Lexicon(
+        positiveTokens=positiveTokens, negativeTokens=negativeTokens
+    )
+
+    positiveScores: array = lexicon.scoreDocuments(positiveTest, workers=workers)
+    negativeScores: array = lexicon.scoreDocuments(negativeTest, workers=workers)
 
-        if len(tnTest) > len(fnTest):
-            tnLines.append(test)
-        else:
-            fnLines.append(test)
+    tpCount: int = sum([score > 0 for score in positiveScores])
+    tnCount: int = sum([score < 0 for score in negativeScores])
 
-    truePositive: float = len(tpLines) / len(positiveTest)
-    trueNegative: float = len(tnLines) / len(negativeTest)
-    falsePositive: float = len(fpLines) / len(positiveTest)
-    falseNegative: float = len(fnLines) / len(negativeTest)
+    truePositive: float = tpCount / len(positiveScores)
+    trueNegative: float = tnCount / len(negativeScores)
+    falsePositive: float = (len(positiveScores) - tpCount) / len(positiveScores)
+    falseNegative: float = (len(negativeScores) - tnCount) / len(negativeScores)
 
-    testingSize: int = len(positiveTest) + len(negativeTest)
-    generalAccuracy: float = (len(tpLines) + len(tnLines)) / testingSize
+    testingSize: int = len(positiveScores) + len(negativeScores)
+    generalAccuracy: float = (tpCount + tnCount) / testingSize
     generalInaccuracy: float = 1 - generalAccuracy
 
     return (
@@ -99,11 +148,11 @@ def main() -> None:
     positiveSentiment: PurePath = PurePath("positive")
     negativeSentiment: PurePath = PurePath("negative")
 
-    downloadData(
+    download(
         url="https://raw.githubusercontent.com/dennybritz/cnn-text-classification-tf/master/data/rt-polaritydata/rt-polarity.pos",
         filepath=positiveSentiment,
     )
-    downloadData(
+    download(
         url="https://raw.githubusercontent.com/dennybritz/cnn-text-classification-tf/master/data/rt-polaritydata/rt-polarity.neg",
         filepath=negativeSentiment,
     )
@@ -1,150 +1,223 @@
-from collections import defaultdict
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 from json import dumps
-from math import floor, log10
+from math import log10
+from os import cpu_count, replace
+from os.path import getsize
 from pathlib import PurePath
 from pprint import pprint
-from typing import List, Tuple
+from time import monotonic
+from typing import IO, Iterable, Iterator, List, Sequence, Tuple
 
+import numpy
+from numpy import memmap, ndarray
 from pandas import DataFrame
-from requests import Response, get
+from scipy.sparse import csr_matrix
 
+from nlp.common.download import download
+from nlp.common.split import IndexedView, splitIndices
+from nlp.common.tokenizer import Tokenizer
 
-def downloadData(url: str, filepath: PurePath) -> None:
-    resp: Response = get(url)
-
-    text: str = resp.content.decode(encoding="UTF-8")
-    lines: List[str] = text.split(sep="\n")
-    lines = [f"{line}\n" for line in lines]
-
-    with open(file=filepath, mode="w") as sentiment:
-        sentiment.writelines(lines)
-        sentiment.close()
+tokenizer: Tokenizer = Tokenizer()
 
 
 def loadData(filepath: PurePath) -> List[str]:
     """Loads data and removes punctuation"""
-    data: List[str]
+    return list(tokenizer.streamDocuments(filepath))
 
-    with open(filepath, "r") as dataFile:
-        data = dataFile.readlines()
-        dataFile.close()
 
-    data = [d.strip() for d in data]
+def streamData(filepath: PurePath, label: int) -> Iterator[Tuple[str, int]]:
+    """Yields (document, label) pairs one line at a time and removes punctuation"""
+    document: str
+    for document in tokenizer.streamDocuments(filepath):
+        yield (document, label)
 
-    idx: int
-    for idx in range(len(data)):
-        tokens: List[str] = [
-            token.lower() for token in data[idx].split(" ") if token.isalpha()
-        ]
 
-        data[idx] = " ".join(tokens)
+def splitData(data: Sequence[str]) -> Tuple[IndexedView, IndexedView, IndexedView]:
+    """Splits data in order into 70% training, 15% validation, and 15% testing"""
+    training, validation, testing = splitIndices(size=len(data), shuffle=False)
 
-    return data
+    return (
+        IndexedView(data=data, indices=training),
+        IndexedView(data=data, indices=validation),
+        IndexedView(data=data, indices=testing),
+    )
+
+
+def computeDocumentFrequency(
+    positiveData: List[str], negativeData: List[str]
+) -> Tuple[float, float]:
+    documentCount: int = len(positiveData) + len(negativeData)
 
+    positiveClassLog = log10(len(positiveData) / documentCount)
+    negativeClassLog = log10(len(negativeData) / documentCount)
 
-def splitData(data: List[str]) -> Tuple[List[str], List[str], List[str]]:
-    data: List[str] = list(data)
-    dataLength: int = len(data)
+    return (positiveClassLog, negativeClassLog)
 
-    trainingLastIdx: int = floor(dataLength * 0.7)
-    validationLastIdx: int = floor(dataLength * 0.85)
 
-    training: List[str] = data[0:trainingLastIdx]
-    validation: List[str] = data[trainingLastIdx:validationLastIdx]
-    testing: List[str] = data[validationLastIdx:-1]
+class Vocabulary:
+    """Maps tokens to dense integer IDs that are shared by every class"""
 
-    return (training, validation, testing)
+    def __init__(self) -> None:
+        self.tokenIDs: dict[str, int] = {}
 
+    def __len__(self) -> int:
+        return len(self.tokenIDs)
 
-def computeDocumentFrequency(
-    positiveData: List[str], negativeData: List[str]
-) -> Tuple[float, float]:
-    data: List[str] = positiveData + negativeData
+    def __contains__(self, token: str) -> bool:
+        return token in self.tokenIDs
 
-    positiveClassLog = log10(len(positiveData) / len(data))
-    negativeClassLog = log10(len(negativeData) / len(data))
+    @property
+    def tokens(self) -> List[str]:
+        """Tokens ordered by their ID"""
+        return list(self.tokenIDs)
 
-    return (positiveClassLog, negativeClassLog)
+    def serialize(self) -> bytes:
+        """Returns the tokens ordered by their ID as newline terminated UTF-8"""
+        return "".join(f"{token}\n" for token in self.tokenIDs).encode(encoding="UTF-8")
 
+    @classmethod
+    def deserialize(cls, data: bytes) -> "Vocabulary":
+        vocabulary: Vocabulary = cls()
+        tokens: List[str] = data.decode(encoding="UTF-8").split(sep="\n")[:-1]
+        vocabulary.tokenIDs = {token: idx for idx, token in enumerate(tokens)}
 
-def createVocabulary(positiveData: List[str], negativeData: List[str]) -> List[str]:
-    vocab: List[str] = []
-    documents: List[str] = positiveData + negativeData
+        return vocabulary
 
-    document: str
-    for document in documents:
-        vocab.extend(document.split(" "))
+    def encode(self, document: str) -> array:
+        """Returns the token IDs of a document, adding unseen tokens"""
+        tokenIDs: dict[str, int] = self.tokenIDs
 
-    return vocab
+        return array(
+            "i",
+            [
+                tokenIDs.setdefault(token, len(tokenIDs))
+                for token in document.split(" ")
+            ],
+        )
+
+    def lookup(self, tokens: List[str]) -> ndarray:
+        """Returns the IDs of tokens, using -1 for unseen tokens"""
+        tokenIDs: dict[str, int] = self.tokenIDs
+
+        return numpy.fromiter(
+            (tokenIDs.get(token, -1) for token in tokens),
+            dtype=numpy.int32,
+            count=len(tokens),
+        )
+
+
+class SortedVocabulary:
+    """A read-only vocabulary stored as a sorted array of UTF-8 encoded tokens
+
+    Token IDs are positions within the sorted array and are found with a binary
+    search, so the vocabulary can be used straight from a memory-mapped file
+    without building a dict.
+    """
+
+    def __init__(self, tokens: ndarray) -> None:
+        self.sortedTokens: ndarray = tokens
+
+    def __len__(self) -> int:
+        return self.sortedTokens.shape[0]
+
+    @property
+    def tokens(self) -> List[str]:
+        """Tokens ordered by their ID"""
+        return [token.decode(encoding="UTF-8") for token in self.sortedTokens]
+
+    def lookup(self, tokens: List[str]) -> ndarray:
+        """Returns the IDs of tokens, using -1 for unseen tokens"""
+        if len(self) == 0:
+            return numpy.full(len(tokens), -1, dtype=numpy.int32)
+
+        encodedTokens: List[bytes] = [
+            token.encode(encoding="UTF-8") for token in tokens
+        ]
+        fits: ndarray = numpy.fromiter(
+            (len(token) <= self.sortedTokens.itemsize for token in encodedTokens),
+            dtype=bool,
+            count=len(tokens),
+        )
+        queries: ndarray = numpy.array(encodedTokens, dtype=self.sortedTokens.dtype)
+
+        positions: ndarray = numpy.searchsorted(self.sortedTokens, queries)
+        positions = numpy.minimum(positions, len(self) - 1)
+        found: ndarray = fits & (self.sortedTokens[positions] == queries)
+
+        return numpy.where(found, positions, -1).astype(numpy.int32)
+
+
+def accumulateCounts(counts: ndarray, tokenIDs: array, size: int) -> ndarray:
+    """Adds the bincount of tokenIDs to counts, growing counts to size entries"""
+    chunkCounts: ndarray = numpy.bincount(
+        numpy.frombuffer(tokenIDs, dtype=numpy.int32), minlength=size
+    )
 
+    counts = numpy.pad(counts, (0, size - counts.shape[0]))
+    counts += chunkCounts
 
-def computeWordFrequency(data: List[str]) -> Tuple[dict[str, int], int]:
-    words: List[str] = []
-    dataDict: defaultdict[str, int] = defaultdict(int)
+    return counts
+
+
+def computeWordFrequency(
+    data: List[str], vocabulary: Vocabulary, chunkSize: int = 1 << 20
+) -> Tuple[ndarray, int]:
+    counts: ndarray = numpy.zeros(0, dtype=numpy.int64)
+    tokenIDs: array = array("i")
 
     sentence: str
     for sentence in data:
-        words.extend(sentence.split(" "))
-
-    word: str
-    for word in words:
-        dataDict[word] += 1
+        tokenIDs.extend(vocabulary.encode(sentence))
 
-    dataDict: dict[str, int] = dict(dataDict)
+        if len(tokenIDs) >= chunkSize:
+            counts = accumulateCounts(counts, tokenIDs, len(vocabulary))
+            tokenIDs = array("i")
 
-    wordCount: int = 0
-    for word in dataDict:
-        wordCount += dataDict[word]
+    counts = accumulateCounts(counts, tokenIDs, len(vocabulary))
 
-    return (dataDict, wordCount)
+    return (counts, int(counts.sum()))
 
 
 def computeClassLikelihoods(
-    positiveData: dict[str, int],
-    negativeData: dict[str, int],
+    positiveData: ndarray,
+    negativeData: ndarray,
     positiveWordFrequency: int,
     negativeWordFrequency: int,
-    vocab: List[str],
-) -> dict:
-    positiveLikelihood: dict[str, float] = {}
-    negativeLikelihood: dict[str, float] = {}
-
-    word: str
-    for word in positiveData:
-        count: int = positiveData[word] + 1
-        positiveWordCount: int = positiveWordFrequency + 1
-        positiveLikelihood[word] = positiveLikelihood.get(
-            word, log10(count / positiveWordCount)
-        )
+    vocabulary: Vocabulary,
+) -> ndarray:
+    """Returns a (len(vocabulary), 2) array of positive and negative likelihoods
 
-    for word in negativeData:
-        count: int = negativeData[word] + 1
-        negativeWordCount: int = negativeWordFrequency + 1
-        negativeLikelihood[word] = negativeLikelihood.get(
-            word, log10(count / negativeWordCount)
+    Words that were not seen in both classes are given a likelihood of 0 so that
+    they do not contribute to the score of a document.
+    """
+    size: int = len(vocabulary)
+    positiveCounts: ndarray = numpy.pad(positiveData, (0, size - positiveData.shape[0]))
+    negativeCounts: ndarray = numpy.pad(negativeData, (0, size - negativeData.shape[0]))
+
+    likelihoods: ndarray = numpy.column_stack(
+        (
+            numpy.log10((positiveCounts + 1) / (positiveWordFrequency + 1)),
+            numpy.log10((negativeCounts + 1) / (negativeWordFrequency + 1)),
         )
+    )
+    likelihoods[(positiveCounts == 0) | (negativeCounts == 0)] = 0
 
-    data = {
-        word: (positiveLikelihood.get(word), negativeLikelihood.get(word))
-        for word in vocab
-        if positiveLikelihood.get(word) != None and negativeLikelihood.get(word) != None
-    }
-    return data
+    return likelihoods
 
 
 def trainNaiveBayes(
     positiveTrainingData: List[str], negativeTrainingData: List[str]
-) -> Tuple:
-    bigVocab: List[str] = createVocabulary(
-        positiveData=positiveTrainingData, negativeData=negativeTrainingData
-    )
+) -> Tuple[ndarray, Vocabulary]:
+    vocabulary: Vocabulary = Vocabulary()
 
     positiveWordFrequencies, totalPositiveWords = computeWordFrequency(
-        data=positiveTrainingData
+        data=positiveTrainingData, vocabulary=vocabulary
     )
 
     negativeWordFrequencies, totalNegativeWords = computeWordFrequency(
-        data=negativeTrainingData
+        data=negativeTrainingData, vocabulary=vocabulary
     )
 
     return (
@@ -153,74 +226,502 @@ def trainNaiveBayes(
             negativeData=negativeWordFrequencies,
             positiveWordFrequency=totalPositiveWords,
             negativeWordFrequency=totalNegativeWords,
-            vocab=bigVocab,
+            vocabulary=vocabulary,
         ),
-        bigVocab,
+        vocabulary,
+    )
+
+
+class NaiveBayesTrainer:
+    """Trains Naive Bayes incrementally from chunks of (document, label) pairs
+
+    Only the vocabulary and the per-class counts are kept in memory, so peak
+    memory depends on the chunk size rather than the size of the corpus. Labels
+    are 1 for positive documents and 0 for negative documents.
+    """
+
+    def __init__(self) -> None:
+        self.vocabulary: Vocabulary = Vocabulary()
+        self.wordCounts: List[ndarray] = [
+            numpy.zeros(0, dtype=numpy.int64),
+            numpy.zeros(0, dtype=numpy.int64),
+        ]
+        self.documentCounts: List[int] = [0, 0]
+
+    @property
+    def documentsSeen(self) -> int:
+        return sum(self.documentCounts)
+
+    def partial_fit(self, documents: List[Tuple[str, int]]) -> "NaiveBayesTrainer":
+        """Adds the word and document counts of one chunk of documents"""
+        tokenIDs: List[array] = [array("i"), array("i")]
+
+        document: str
+        label: int
+        for document, label in documents:
+            tokenIDs[label].extend(self.vocabulary.encode(document))
+            self.documentCounts[label] += 1
+
+        for label in (0, 1):
+            self.wordCounts[label] = accumulateCounts(
+                self.wordCounts[label], tokenIDs[label], len(self.vocabulary)
+            )
+
+        return self
+
+    def fit(
+        self,
+        documents: Iterable[Tuple[str, int]],
+        chunkSize: int = 10000,
+        checkpointPath: PurePath | None = None,
+        skip: int = 0,
+        checkpointInterval: float = 60.0,
+    ) -> "NaiveBayesTrainer":
+        """Trains on chunkSize documents at a time, checkpointing as it goes
+
+        A checkpoint is written after the first chunk that finishes at least
+        checkpointInterval seconds after the last one, and once more at the end
+        of the stream, so the cost of writing the vocabulary and counts does not
+        grow with the number of chunks. The first skip documents are discarded,
+        which allows training to resume from a checkpoint by passing the same
+        stream with skip=documentsSeen.
+        """
+        documents = islice(documents, skip, None)
+        lastCheckpoint: float = monotonic()
+        pendingChunks: int = 0
+
+        while True:
+            chunk: List[Tuple[str, int]] = list(islice(documents, chunkSize))
+            if len(chunk) == 0:
+                break
+
+            self.partial_fit(chunk)
+            pendingChunks += 1
+
+            if (
+                checkpointPath is not None
+                and monotonic() - lastCheckpoint >= checkpointInterval
+            ):
+                self.checkpoint(checkpointPath)
+                lastCheckpoint = monotonic()
+                pendingChunks = 0
+
+        if checkpointPath is not None and pendingChunks > 0:
+            self.checkpoint(checkpointPath)
+
+        return self
+
+    def classLogs(self) -> Tuple[float, float]:
+        """Returns the positive and negative class document frequencies"""
+        positiveClassLog: float = log10(self.documentCounts[1] / self.documentsSeen)
+        negativeClassLog: float = log10(self.documentCounts[0] / self.documentsSeen)
+
+        return (positiveClassLog, negativeClassLog)
+
+    def classLikelihoods(self) -> ndarray:
+        return computeClassLikelihoods(
+            positiveData=self.wordCounts[1],
+            negativeData=self.wordCounts[0],
+            positiveWordFrequency=int(self.wordCounts[1].sum()),
+            negativeWordFrequency=int(self.wordCounts[0].sum()),
+            vocabulary=self.vocabulary,
+        )
+
+    def checkpoint(self, filepath: PurePath) -> None:
+        """Atomically writes the trainer state to filepath as an .npz archive"""
+        size: int = len(self.vocabulary)
+        tempFilepath: str = f"{filepath}.tmp"
+
+        with open(tempFilepath, "wb") as checkpointFile:
+            numpy.savez(
+                checkpointFile,
+                vocabulary=numpy.frombuffer(
+                    self.vocabulary.serialize(), dtype=numpy.uint8
+                ),
+                negativeCounts=numpy.pad(
+                    self.wordCounts[0], (0, size - self.wordCounts[0].shape[0])
+                ),
+                positiveCounts=numpy.pad(
+                    self.wordCounts[1], (0, size - self.wordCounts[1].shape[0])
+                ),
+                documentCounts=numpy.array(self.documentCounts, dtype=numpy.int64),
+            )
+            checkpointFile.close()
+
+        replace(tempFilepath, filepath)
+
+    @classmethod
+    def resume(cls, filepath: PurePath) -> "NaiveBayesTrainer":
+        """Loads a trainer from a checkpoint written by checkpoint()"""
+        trainer: NaiveBayesTrainer = cls()
+
+        with numpy.load(filepath) as checkpointData:
+            trainer.vocabulary = Vocabulary.deserialize(
+                checkpointData["vocabulary"].tobytes()
+            )
+            trainer.wordCounts = [
+                checkpointData["negativeCounts"],
+                checkpointData["positiveCounts"],
+            ]
+            trainer.documentCounts = [
+                int(count) for count in checkpointData["documentCounts"]
+            ]
+
+        return trainer
+
+
+def createDocumentTermMatrix(
+    documents: List[str], vocabulary: Vocabulary | SortedVocabulary
+) -> csr_matrix:
+    """Returns a sparse (len(documents), len(vocabulary)) matrix of token counts
+
+    Tokens that are not in the vocabulary are dropped. Repeated tokens are stored
+    as duplicate entries, which scipy sums when the matrix is used.
+    """
+    indptr: array = array("q", [0])
+    tokens: List[str] = []
+
+    document: str
+    for document in documents:
+        tokens.extend(document.split(" "))
+        indptr.append(len(tokens))
+
+    tokenIDs: ndarray = vocabulary.lookup(tokens)
+    known: ndarray = tokenIDs >= 0
+    knownCounts: ndarray = numpy.concatenate(([0], numpy.cumsum(known)))
+
+    tokenIDs = tokenIDs[known]
+    rowPointers: ndarray = knownCounts[numpy.frombuffer(indptr, dtype=numpy.int64)]
+
+    return csr_matrix(
+        (numpy.ones(tokenIDs.shape[0], dtype=numpy.int32), tokenIDs, rowPointers),
+        shape=(len(documents), len(vocabulary)),
     )
 
 
 def testNaiveBayes(
     testingData: List[str],
-    testingClass: int,
-    classLikelihoods: dict,
+    classLikelihoods: ndarray,
+    vocabulary: Vocabulary | SortedVocabulary,
     positiveClassLog: float,
     negativeClassLog: float,
-) -> dict[str, int, int, float, float]:
-    data: dict = {}
+) -> Tuple[ndarray, ndarray, ndarray]:
+    """Scores every document with one sparse matrix product
 
-    document: str
-    for document in testingData:
-        positiveDocumentProbability: float = positiveClassLog
-        negativeDocumentProbability: float = negativeClassLog
-        words: List[str] = document.split(" ")
-
-        word: str
-        for word in words:
-            try:
-                positiveDocumentProbability += classLikelihoods[word][0]
-            except KeyError:
-                pass
-
-            try:
-                negativeDocumentProbability += classLikelihoods[word][1]
-            except KeyError:
-                pass
-            except IndexError:
-                pass
-
-        documentClass: int
-        diff: float
-        if positiveDocumentProbability > negativeDocumentProbability:
-            documentClass = 1
-            diff = positiveDocumentProbability - negativeDocumentProbability
-        elif positiveDocumentProbability < negativeDocumentProbability:
-            documentClass = 0
-            diff = negativeDocumentProbability - positiveDocumentProbability
-        else:
-            documentClass = 0
-            diff = 0
-
-        data[document] = [
-            documentClass,
-            testingClass,
-            positiveDocumentProbability,
-            negativeDocumentProbability,
-            diff,
-        ]
+    Returns the predicted class of each document (1 if positive, else 0), an
+    (len(testingData), 2) array of positive and negative document probabilities,
+    and the absolute difference between the two probabilities.
+    """
+    documentTermMatrix: csr_matrix = createDocumentTermMatrix(
+        documents=testingData, vocabulary=vocabulary
+    )
 
-    return data
+    scores: ndarray = documentTermMatrix @ classLikelihoods
+    scores += numpy.array([positiveClassLog, negativeClassLog])
 
+    predictions: ndarray = (scores[:, 0] > scores[:, 1]).astype(numpy.int8)
+    margins: ndarray = numpy.abs(scores[:, 0] - scores[:, 1])
 
-def computeAccuracy(test: dict) -> Tuple[float, float]:
-    properlyLabelledDocuments: int = 0
+    return (predictions, scores, margins)
+
+
+MODEL_MAGIC: bytes = b"NBMODEL1"
+MODEL_HEADER: numpy.dtype = numpy.dtype(
+    [("magic", "S8"), ("vocabularySize", "<u8"), ("tokenWidth", "<u8")]
+)
+
+
+def saveNaiveBayes(
+    filepath: PurePath,
+    classLikelihoods: ndarray,
+    vocabulary: Vocabulary,
+    positiveClassLog: float,
+    negativeClassLog: float,
+) -> None:
+    """Atomically writes a trained model to filepath in a memory-mappable format
+
+    The file is a fixed size header, the float32 positive and negative class
+    document frequencies, the (V, 2) float32 class likelihoods, and the V
+    tokens as a sorted, fixed width UTF-8 array whose positions are the row
+    indices of the class likelihoods.
+    """
+    tokens: ndarray = numpy.array(
+        [token.encode(encoding="UTF-8") for token in vocabulary.tokens],
+        dtype=numpy.bytes_,
+    )
+    order: ndarray = numpy.argsort(tokens, kind="stable")
+
+    header: ndarray = numpy.array(
+        [(MODEL_MAGIC, tokens.shape[0], tokens.dtype.itemsize)], dtype=MODEL_HEADER
+    )
+    classLogs: ndarray = numpy.array([positiveClassLog, negativeClassLog], dtype="<f4")
+    tempFilepath: str = f"{filepath}.tmp"
+
+    with open(tempFilepath, "wb") as modelFile:
+        modelFile.write(header.tobytes())
+        modelFile.write(classLogs.tobytes())
+        modelFile.write(
+            numpy.ascontiguousarray(classLikelihoods[order], dtype="<f4").tobytes()
+        )
+        modelFile.write(tokens[order].tobytes())
+        modelFile.close()
+
+    replace(tempFilepath, filepath)
+
+
+class NaiveBayesModel:
+    """A trained model memory-mapped from a file written by saveNaiveBayes()
+
+    The arrays are read-only views of the file, so every process that loads the
+    same model shares one copy of it through the page cache.
+    """
+
+    def __init__(
+        self,
+        classLikelihoods: ndarray,
+        vocabulary: SortedVocabulary,
+        positiveClassLog: float,
+        negativeClassLog: float,
+    ) -> None:
+        self.classLikelihoods: ndarray = classLikelihoods
+        self.vocabulary: SortedVocabulary = vocabulary
+        self.positiveClassLog: float = positiveClassLog
+        self.negativeClassLog: float = negativeClassLog
+
+    @classmethod
+    def load(cls, filepath: PurePath) -> "NaiveBayesModel":
+        # numpy.memmap calls resolve() on path objects, which PurePath lacks
+        filepath = str(filepath)
+        header: ndarray = numpy.fromfile(filepath, dtype=MODEL_HEADER, count=1)
+        if header.shape[0] != 1 or header["magic"][0] != MODEL_MAGIC:
+            raise ValueError(f"{filepath} is not a Naive Bayes model file")
+
+        vocabularySize: int = int(header["vocabularySize"][0])
+        tokenWidth: int = int(header["tokenWidth"][0])
+
+        offset: int = MODEL_HEADER.itemsize
+        classLogs: memmap = memmap(
+            filepath, dtype="<f4", mode="r", offset=offset, shape=(2,)
+        )
+
+        offset += classLogs.nbytes
+        classLikelihoods: memmap = memmap(
+            filepath, dtype="<f4", mode="r", offset=offset, shape=(vocabularySize, 2)
+        )
+
+        offset += classLikelihoods.nbytes
+        tokens: memmap = memmap(
+            filepath,
+            dtype=f"S{tokenWidth}",
+            mode="r",
+            offset=offset,
+            shape=(vocabularySize,),
+        )
+
+        return cls(
+            classLikelihoods=classLikelihoods,
+            vocabulary=SortedVocabulary(tokens=tokens),
+            positiveClassLog=float(classLogs[0]),
+            negativeClassLog=float(classLogs[1]),
+        )
+
+    def test(self, testingData: List[str]) -> Tuple[ndarray, ndarray, ndarray]:
+        return testNaiveBayes(
+            testingData=testingData,
+            classLikelihoods=self.classLikelihoods,
+            vocabulary=self.vocabulary,
+            positiveClassLog=self.positiveClassLog,
+            negativeClassLog=self.negativeClassLog,
+        )
+
+
+workerModel: NaiveBayesModel | None = None
 
-    document: str
-    for document in test:
-        correctLabel: int = test[document][1]
-        if test[document][0] == correctLabel:
-            properlyLabelledDocuments += 1
 
-    totalDocumentCount: int = len(test.keys())
+def findShards(filepath: PurePath, shardCount: int) -> List[Tuple[int, int]]:
+    """Splits a file into at most shardCount byte ranges that end on a newline"""
+    fileSize: int = getsize(filepath)
+    boundaries: List[int] = [0]
+
+    with open(filepath, "rb") as dataFile:
+        idx: int
+        for idx in range(1, shardCount):
+            dataFile.seek(max(fileSize * idx // shardCount, boundaries[-1]))
+            dataFile.readline()
+            boundaries.append(min(dataFile.tell(), fileSize))
+        dataFile.close()
+
+    boundaries.append(fileSize)
+
+    return [
+        (start, end) for start, end in zip(boundaries, boundaries[1:]) if start < end
+    ]
+
+
+def initScoringWorker(modelPath: PurePath) -> None:
+    """Memory-maps the model once per worker process"""
+    global workerModel
+    workerModel = NaiveBayesModel.load(modelPath)
+
+
+def scoreShard(
+    filepath: PurePath, start: int, end: int, batchSize: int = 100000
+) -> Tuple[ndarray, ndarray, ndarray]:
+    """Cleans and scores the lines within the byte range [start, end)"""
+    with open(filepath, "rb") as dataFile:
+        dataFile.seek(start)
+        lines: List[bytes] = dataFile.read(end - start).split(sep=b"\n")
+        dataFile.close()
+
+    if lines[-1] == b"":
+        lines.pop()
+
+    results: List[Tuple[ndarray, ndarray, ndarray]] = [
+        workerModel.test(
+            [
+                tokenizer.normalize(line.decode(encoding="UTF-8"))
+                for line in lines[idx : idx + batchSize]
+            ]
+        )
+        for idx in range(0, len(lines), batchSize)
+    ]
+
+    if len(results) == 0:
+        results.append(workerModel.test([]))
+
+    return (
+        numpy.concatenate([result[0] for result in results]),
+        numpy.concatenate([result[1] for result in results]),
+        numpy.concatenate([result[2] for result in results]),
+    )
+
+
+def scoreFile(
+    filepath: PurePath,
+    modelPath: PurePath,
+    workers: int | None = None,
+    shardsPerWorker: int = 4,
+) -> Tuple[ndarray, ndarray, ndarray]:
+    """Scores every line of a file in parallel with a model saved by saveNaiveBayes()
+
+    The file is split into byte ranges that are scored by a pool of processes.
+    Each process memory-maps the model, so the class likelihoods are shared
+    through the page cache rather than pickled to every worker. Results are
+    returned in the same order as the lines of the file.
+    """
+    workers = workers or cpu_count() or 1
+    shards: List[Tuple[int, int]] = findShards(
+        filepath=filepath, shardCount=workers * shardsPerWorker
+    )
+
+    if len(shards) == 0:
+        return NaiveBayesModel.load(modelPath).test([])
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=initScoringWorker, initargs=(modelPath,)
+    ) as executor:
+        results: List[Tuple[ndarray, ndarray, ndarray]] = list(
+            executor.map(
+                scoreShard,
+                [filepath] * len(shards),
+                [start for start, _ in shards],
+                [end for _, end in shards],
+            )
+        )
+
+    return (
+        numpy.concatenate([result[0] for result in results]),
+        numpy.concatenate([result[1] for result in results]),
+        numpy.concatenate([result[2] for result in results]),
+    )
+
+
+RESULT_RECORD: numpy.dtype = numpy.dtype(
+    [
+        ("prediction", "i1"),
+        ("label", "i1"),
+        ("positive", "<f8"),
+        ("negative", "<f8"),
+        ("margin", "<f8"),
+    ]
+)
+
+
+class ResultWriter:
+    """Streams scored documents to disk one batch at a time
+
+    The "jsonl" format writes one compact JSON object per document. The "binary"
+    format writes RESULT_RECORD structs without the document text, which can be
+    read back with numpy.fromfile(filepath, dtype=RESULT_RECORD). At most
+    bufferSize bytes are held in memory before being written.
+    """
+
+    def __init__(
+        self,
+        filepath: PurePath,
+        outputFormat: str = "jsonl",
+        bufferSize: int = 1 << 20,
+    ) -> None:
+        if outputFormat not in ("jsonl", "binary"):
+            raise ValueError(f"Unknown result format: {outputFormat}")
+
+        self.outputFormat: str = outputFormat
+        self.resultFile: IO = open(
+            filepath,
+            mode="w" if outputFormat == "jsonl" else "wb",
+            buffering=bufferSize,
+        )
+
+    def __enter__(self) -> "ResultWriter":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def write(
+        self,
+        testingData: List[str],
+        testingClass: int,
+        predictions: ndarray,
+        scores: ndarray,
+        margins: ndarray,
+    ) -> None:
+        if self.outputFormat == "binary":
+            records: ndarray = numpy.empty(predictions.shape[0], dtype=RESULT_RECORD)
+            records["prediction"] = predictions
+            records["label"] = testingClass
+            records["positive"] = scores[:, 0]
+            records["negative"] = scores[:, 1]
+            records["margin"] = margins
+            records.tofile(self.resultFile)
+            return
+
+        self.resultFile.writelines(
+            dumps(
+                obj={
+                    "document": document,
+                    "prediction": prediction,
+                    "label": testingClass,
+                    "positive": positive,
+                    "negative": negative,
+                    "margin": margin,
+                },
+                separators=(",", ":"),
+            )
+            + "\n"
+            for document, prediction, (positive, negative), margin in zip(
+                testingData, predictions.tolist(), scores.tolist(), margins.tolist()
+            )
+        )
+
+    def close(self) -> None:
+        self.resultFile.close()
+
+
+def computeAccuracy(predictions: ndarray, testingClass: int) -> Tuple[float, float]:
+    properlyLabelledDocuments: int = int((predictions == testingClass).sum())
+
+    totalDocumentCount: int = predictions.shape[0]
 
     hitPercentage: float = properlyLabelledDocuments / totalDocumentCount
     missPercentage: float = 1 - hitPercentage
@@ -235,28 +736,29 @@ def computeAccuracy(test: dict) -> Tuple[float, float]:
 
 
 def main() -> None:
-    positiveTrainingData: List[str]
-    positiveDevelopmentData: List[str]
-    positiveTestingData: List[str]
+    positiveTrainingData: IndexedView
+    positiveDevelopmentData: IndexedView
+    positiveTestingData: IndexedView
 
-    negativeTrainingData: List[str]
-    negativeDevelopmentData: List[str]
-    negativeTestingData: List[str]
+    negativeTrainingData: IndexedView
+    negativeDevelopmentData: IndexedView
+    negativeTestingData: IndexedView
 
     positiveDocumentLog: float
     negativeDocumentLog: float
 
-    classLikelihoods: dict[str, List[float, float]]
-    vocab: List[str]
+    classLikelihoods: ndarray
+    vocabulary: Vocabulary
 
     positiveSentiment: PurePath = PurePath("positive")
     negativeSentiment: PurePath = PurePath("negative")
+    modelPath: PurePath = PurePath("naiveBayes.model")
 
-    downloadData(
+    download(
         url="https://raw.githubusercontent.com/dennybritz/cnn-text-classification-tf/master/data/rt-polaritydata/rt-polarity.pos",
         filepath=positiveSentiment,
     )
-    downloadData(
+    download(
         url="https://raw.githubusercontent.com/dennybritz/cnn-text-classification-tf/master/data/rt-polaritydata/rt-polarity.neg",
         filepath=negativeSentiment,
     )
@@ -288,38 +790,58 @@ def main() -> None:
         positiveData=positiveTrainingData, negativeData=negativeTrainingData
     )
 
-    classLikelihoods, vocab = trainNaiveBayes(
+    classLikelihoods, vocabulary = trainNaiveBayes(
         positiveTrainingData, negativeTrainingData
     )
 
-    positiveDevelopmentTest: dict = testNaiveBayes(
+    (
+        positiveDevelopmentPredictions,
+        positiveDevelopmentScores,
+        positiveDevelopmentMargins,
+    ) = testNaiveBayes(
         testingData=positiveDevelopmentData,
-        testingClass=1,
         classLikelihoods=classLikelihoods,
+        vocabulary=vocabulary,
         positiveClassLog=positiveDocumentLog,
         negativeClassLog=negativeDocumentLog,
     )
 
-    with open("positiveDevelopment.json", "w") as jsonFile:
-        jsonData: str = dumps(obj=positiveDevelopmentTest, indent=4)
-        jsonFile.write(jsonData)
-        jsonFile.close()
+    with ResultWriter(filepath=PurePath("positiveDevelopment.jsonl")) as resultWriter:
+        resultWriter.write(
+            testingData=positiveDevelopmentData,
+            testingClass=1,
+            predictions=positiveDevelopmentPredictions,
+            scores=positiveDevelopmentScores,
+            margins=positiveDevelopmentMargins,
+        )
 
-    negativeDevelopmentTest: dict = testNaiveBayes(
+    (
+        negativeDevelopmentPredictions,
+        negativeDevelopmentScores,
+        negativeDevelopmentMargins,
+    ) = testNaiveBayes(
         testingData=negativeDevelopmentData,
-        testingClass=0,
         classLikelihoods=classLikelihoods,
+        vocabulary=vocabulary,
         positiveClassLog=positiveDocumentLog,
         negativeClassLog=negativeDocumentLog,
     )
 
-    with open("negativeDevelopment.json", "w") as jsonFile:
-        jsonData: str = dumps(obj=negativeDevelopmentTest, indent=4)
-        jsonFile.write(jsonData)
-        jsonFile.close()
+    with ResultWriter(filepath=PurePath("negativeDevelopment.jsonl")) as resultWriter:
+        resultWriter.write(
+            testingData=negativeDevelopmentData,
+            testingClass=0,
+            predictions=negativeDevelopmentPredictions,
+            scores=negativeDevelopmentScores,
+            margins=negativeDevelopmentMargins,
+        )
 
-    positiveAccuracy: Tuple = computeAccuracy(test=positiveDevelopmentTest)
-    negativeAccuracy: Tuple = computeAccuracy(test=negativeDevelopmentTest)
+    positiveAccuracy: Tuple = computeAccuracy(
+        predictions=positiveDevelopmentPredictions, testingClass=1
+    )
+    negativeAccuracy: Tuple = computeAccuracy(
+        predictions=negativeDevelopmentPredictions, testingClass=0
+    )
 
     print(
         f"""
@@ -331,45 +853,75 @@ def main() -> None:
     """
     )
 
-    positiveTrainingData = positiveTrainingData + positiveDevelopmentData
-    negativeTrainingData = negativeTrainingData + negativeDevelopmentData
+    positiveTrainingData = IndexedView(
+        data=positiveData,
+        indices=numpy.concatenate(
+            [positiveTrainingData.indices, positiveDevelopmentData.indices]
+        ),
+    )
+    negativeTrainingData = IndexedView(
+        data=negativeData,
+        indices=numpy.concatenate(
+            [negativeTrainingData.indices, negativeDevelopmentData.indices]
+        ),
+    )
 
     positiveDocumentLog, negativeDocumentLog = computeDocumentFrequency(
         positiveData=positiveTrainingData, negativeData=negativeTrainingData
     )
 
-    classLikelihoods, vocab = trainNaiveBayes(
+    classLikelihoods, vocabulary = trainNaiveBayes(
         positiveTrainingData, negativeTrainingData
     )
 
-    positiveTest: dict = testNaiveBayes(
+    saveNaiveBayes(
+        filepath=modelPath,
+        classLikelihoods=classLikelihoods,
+        vocabulary=vocabulary,
+        positiveClassLog=positiveDocumentLog,
+        negativeClassLog=negativeDocumentLog,
+    )
+
+    positivePredictions, positiveScores, positiveMargins = testNaiveBayes(
         testingData=positiveTestingData,
-        testingClass=1,
         classLikelihoods=classLikelihoods,
+        vocabulary=vocabulary,
         positiveClassLog=positiveDocumentLog,
         negativeClassLog=negativeDocumentLog,
     )
 
-    with open("positiveTest.json", "w") as jsonFile:
-        jsonData: str = dumps(obj=positiveTest, indent=4)
-        jsonFile.write(jsonData)
-        jsonFile.close()
+    with ResultWriter(filepath=PurePath("positiveTest.jsonl")) as resultWriter:
+        resultWriter.write(
+            testingData=positiveTestingData,
+            testingClass=1,
+            predictions=positivePredictions,
+            scores=positiveScores,
+            margins=positiveMargins,
+        )
 
-    negativeTest: dict = testNaiveBayes(
+    negativePredictions, negativeScores, negativeMargins = testNaiveBayes(
         testingData=negativeTestingData,
-        testingClass=0,
         classLikelihoods=classLikelihoods,
+        vocabulary=vocabulary,
         positiveClassLog=positiveDocumentLog,
         negativeClassLog=negativeDocumentLog,
     )
 
-    with open("negativeTest.json", "w") as jsonFile:
-        jsonData: str = dumps(obj=negativeTest, indent=4)
-        jsonFile.write(jsonData)
-        jsonFile.close()
+    with ResultWriter(filepath=PurePath("negativeTest.jsonl")) as resultWriter:
+        resultWriter.write(
+            testingData=negativeTestingData,
+            testingClass=0,
+            predictions=negativePredictions,
+            scores=negativeScores,
+            margins=negativeMargins,
+        )
 
-    positiveAccuracy: Tuple = computeAccuracy(test=positiveTest)
-    negativeAccuracy: Tuple = computeAccuracy(test=negativeTest)
+    positiveAccuracy: Tuple = computeAccuracy(
+        predictions=positivePredictions, testingClass=1
+    )
+    negativeAccuracy: Tuple = computeAccuracy(
+        predictions=negativePredictions, testingClass=0
+    )
 
     print(
         f"""
@@ -396,11 +948,9 @@ def main() -> None:
     # print("positive")
     # print(dfPositive.tail(n=2)[4], "\n\n")
 
-    # top10Postive: dict = {k : classLikelihoods[k][0] for k in classLikelihoods.keys()}
-    # top10Postive = sorted(top10Postive.items(), key=lambda x: x[1])
+    # top10Postive = sorted(zip(vocabulary.tokens, classLikelihoods[:, 0]), key=lambda x: x[1])
 
-    # top10Negative: dict = {k : classLikelihoods[k][1] for k in classLikelihoods.keys()}
-    # top10Negative = sorted(top10Negative.items(), key=lambda x: x[1])
+    # top10Negative = sorted(zip(vocabulary.tokens, classLikelihoods[:, 1]), key=lambda x: x[1])
 
     # pprint(top10Negative[0:10])
 
@@ -1,66 +1,63 @@
-from collections import Counter
-from pathlib import PurePath
-from typing import List, Tuple
+from array import array
+from hashlib import sha256
+from itertools import chain
+from json import dumps, load
+from math import ceil, log
+from os import replace
+from pathlib import Path, PurePath
+from typing import List, Sequence, Tuple
 
 import numpy
+from joblib import Parallel, delayed
 from numpy import ndarray
 from numpy.random import MT19937, RandomState
-from scipy.sparse import vstack
+from scipy.sparse import issparse, load_npz, save_npz, vstack
 from scipy.sparse._csr import csr_matrix
-from sklearn.decomposition import PCA
-from sklearn.feature_extraction.text import CountVectorizer
-from sklearn.model_selection import GridSearchCV, train_test_split
-from sklearn.pipeline import Pipeline, make_pipeline
-from sklearn.preprocessing import StandardScaler
-from sklearn.svm import SVC
+from scipy.sparse.linalg import LinearOperator, svds
+from sklearn.base import ClassifierMixin
+from sklearn.feature_extraction.text import CountVectorizer, HashingVectorizer
+from sklearn.kernel_approximation import Nystroem, RBFSampler
+from sklearn.linear_model import SGDClassifier
+from sklearn.metrics.pairwise import linear_kernel, rbf_kernel
+from sklearn.model_selection import GridSearchCV, ParameterGrid
+from sklearn.pipeline import make_pipeline
+from sklearn.svm import SVC, LinearSVC
+
+from nlp.common.split import IndexedView, stratifiedKFold, stratifiedSplit
+from nlp.common.tokenizer import Tokenizer
 
 mt19937: MT19937 = MT19937(42)
 rs: RandomState = RandomState(mt19937)
+tokenizer: Tokenizer = Tokenizer()
 
 
 def loadData(filepath: PurePath) -> List[str]:
     """Loads data and removes punctuation"""
-    data: List[str]
-
-    with open(filepath, "r") as dataFile:
-        data = dataFile.readlines()
-        dataFile.close()
-
-    data = [d.strip() for d in data]
-
-    idx: int
-    for idx in range(len(data)):
-        tokens: List[str] = [
-            token.lower() for token in data[idx].split(" ") if token.isalpha()
-        ]
-
-        data[idx] = " ".join(tokens)
-
-    return data
+    return list(tokenizer.streamDocuments(filepath))
 
 
 def splitData(
-    positiveData: List[str], negativeData: List[str]
-) -> List[Tuple[List[str], List[str], List[str]]]:
-    positiveTempData = List[str]
-    negativeTempData = List[str]
+    positiveData: Sequence[str], negativeData: Sequence[str]
+) -> List[Tuple[IndexedView, IndexedView, IndexedView]]:
+    """Splits both classes into 70% training, 15% development, and 15% testing
 
-    positiveTempData, positiveTestingData = train_test_split(
-        positiveData, test_size=0.15, train_size=0.85, random_state=42, shuffle=True
-    )
-    positiveTrainingData, positiveDevelopmentData = train_test_split(
-        positiveTempData, test_size=0.15, train_size=0.7, random_state=42, shuffle=True
-    )
-    negativeTempData, negativeTestingData = train_test_split(
-        negativeData, test_size=0.15, train_size=0.85, random_state=42, shuffle=True
-    )
-    negativeTrainingData, negativeDevelopmentData = train_test_split(
-        negativeTempData, test_size=0.15, train_size=0.7, random_state=42, shuffle=True
-    )
+    The splits are shuffled index views of the data, stratified by class.
+    """
+    positiveCount: int = len(positiveData)
+    labels: ndarray = numpy.repeat([1, 0], [positiveCount, len(negativeData)])
+    splits: List[ndarray] = stratifiedSplit(labels=labels, seed=42)
 
     return [
-        (positiveTrainingData, positiveDevelopmentData, positiveTestingData),
-        (negativeTrainingData, negativeDevelopmentData, negativeTestingData),
+        tuple(
+            IndexedView(data=positiveData, indices=split[split < positiveCount])
+            for split in splits
+        ),
+        tuple(
+            IndexedView(
+                data=negativeData, indices=split[split >= positiveCount] - positiveCount
+            )
+            for split in splits
+        ),
     ]
 
 
@@ -74,72 +71,644 @@ def createWordList(data: List[str]) -> List[str]:
     return wordList
 
 
+def createVocabularyIndex(wordSet: set[str]) -> dict[str, int]:
+    """Maps each word to a stable column index by sorting the words"""
+    return {word: idx for idx, word in enumerate(sorted(wordSet))}
+
+
 def termDocumentFrequency(
-    data: List[str], wordSet: set[str], label: int
-) -> List[List[int]]:
-    tdfDict: dict[str, List[int]] = {document: [label] for document in data}
-    tdfList: List[List[str]] = []
+    data: List[str], vocabularyIndex: dict[str, int]
+) -> csr_matrix:
+    """Returns a sparse (len(data), len(vocabularyIndex)) matrix of word counts
+
+    Words that are not in vocabularyIndex are dropped. Counts are stored as
+    uint16 when they fit, and as int32 otherwise.
+    """
+    indptr: array = array("q", [0])
+    indices: array = array("i")
+
+    document: str
+    for document in data:
+        indices.extend(
+            vocabularyIndex[word]
+            for word in document.split(" ")
+            if word in vocabularyIndex
+        )
+        indptr.append(len(indices))
+
+    tdf: csr_matrix = csr_matrix(
+        (
+            numpy.ones(len(indices), dtype=numpy.int32),
+            numpy.frombuffer(indices, dtype=numpy.int32),
+            numpy.frombuffer(indptr, dtype=numpy.int64),
+        ),
+        shape=(len(data), len(vocabularyIndex)),
+    )
+    tdf.sum_duplicates()
+
+    if tdf.nnz == 0 or tdf.data.max() <= numpy.iinfo(numpy.uint16).max:
+        tdf.data = tdf.data.astype(numpy.uint16)
+
+    return tdf
+
+
+class SparseReducer:
+    """Standardizes sparse data and projects it onto its principal components
+
+    Columns are divided by their standard deviation and the data is centered
+    implicitly within a LinearOperator, so the sparse input is never densified.
+    The top components are found with a truncated SVD (scipy's svds). The
+    reducer is fitted once and can then transform any number of datasets.
+    """
+
+    def __init__(self, numberOfComponents: int = 10) -> None:
+        self.numberOfComponents: int = numberOfComponents
+        self.scale: ndarray | None = None
+        self.mean: ndarray | None = None
+        self.components: ndarray | None = None
+
+    def fit(self, data: csr_matrix) -> "SparseReducer":
+        if min(data.shape) < 2:
+            raise ValueError(
+                f"Cannot fit a SparseReducer on data of shape {data.shape}"
+            )
+
+        data = csr_matrix(data, dtype=numpy.float64)
+
+        mean: ndarray = numpy.asarray(data.mean(axis=0)).ravel()
+        squaredMean: ndarray = numpy.asarray(data.multiply(data).mean(axis=0)).ravel()
+        std: ndarray = numpy.sqrt(numpy.maximum(squaredMean - mean**2, 0))
+        std[std == 0] = 1
+
+        self.scale = 1 / std
+        self.mean = mean * self.scale
+        scaledData: csr_matrix = csr_matrix(data.multiply(self.scale))
+
+        centeredData: LinearOperator = LinearOperator(
+            shape=scaledData.shape,
+            matvec=lambda v: scaledData @ v - self.mean @ v,
+            rmatvec=lambda u: scaledData.T @ numpy.ravel(u) - self.mean * numpy.sum(u),
+            matmat=lambda v: scaledData @ v - self.mean @ v,
+            rmatmat=lambda u: scaledData.T @ u - numpy.outer(self.mean, u.sum(axis=0)),
+            dtype=numpy.float64,
+        )
+
+        componentCount: int = min(self.numberOfComponents, min(scaledData.shape) - 1)
+        startVector: ndarray = RandomState(MT19937(42)).uniform(
+            -1, 1, size=min(scaledData.shape)
+        )
+        _, singularValues, components = svds(
+            centeredData, k=componentCount, v0=startVector
+        )
+
+        # svds returns the components in ascending order of singular value and
+        # with arbitrary signs, so sort them and make the largest entry positive
+        components = components[numpy.argsort(singularValues)[::-1]]
+        signs: ndarray = numpy.sign(
+            components[
+                numpy.arange(componentCount), numpy.abs(components).argmax(axis=1)
+            ]
+        )
+        self.components = components * signs[:, numpy.newaxis]
+
+        return self
+
+    def save(self, filepath: PurePath) -> None:
+        with open(filepath, "wb") as reducerFile:
+            numpy.savez(
+                reducerFile,
+                scale=self.scale,
+                mean=self.mean,
+                components=self.components,
+            )
+            reducerFile.close()
+
+    def load(self, filepath: PurePath) -> "SparseReducer":
+        with numpy.load(filepath) as reducerData:
+            self.scale = reducerData["scale"]
+            self.mean = reducerData["mean"]
+            self.components = reducerData["components"]
+
+        self.numberOfComponents = self.components.shape[0]
+
+        return self
+
+    def transform(self, data: csr_matrix) -> ndarray:
+        scaledData: csr_matrix = csr_matrix(
+            csr_matrix(data, dtype=numpy.float64).multiply(self.scale)
+        )
+
+        return scaledData @ self.components.T - self.mean @ self.components.T
+
+
+class FeatureCache:
+    """Stores sparse feature matrices and fitted reducers on disk
+
+    Entries are kept in a directory named after a SHA-256 hash of the contents
+    of the input files, the parameters that were used to split and vectorize
+    them, and the vocabulary. Changing any of these changes the hash, so stale
+    features are never loaded.
+    """
+
+    def __init__(
+        self,
+        inputPaths: List[PurePath],
+        parameters: dict,
+        vocabularyIndex: dict[str, int],
+        directory: PurePath = PurePath("featureCache"),
+    ) -> None:
+        digest = sha256()
+
+        inputPath: PurePath
+        for inputPath in inputPaths:
+            with open(inputPath, "rb") as inputFile:
+                for chunk in iter(lambda: inputFile.read(1 << 20), b""):
+                    digest.update(chunk)
+                inputFile.close()
+
+        digest.update(dumps(parameters, sort_keys=True).encode(encoding="UTF-8"))
+
+        word: str
+        for word in sorted(vocabularyIndex, key=vocabularyIndex.get):
+            digest.update(f"{word}\n".encode(encoding="UTF-8"))
+
+        self.directory: Path = Path(directory, digest.hexdigest())
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def loadDataset(self, name: str) -> Tuple[csr_matrix, ndarray] | None:
+        matrixPath: Path = self.directory / f"{name}.npz"
+        labelsPath: Path = self.directory / f"{name}.labels.npy"
+
+        if not (matrixPath.exists() and labelsPath.exists()):
+            return None
+
+        return (load_npz(matrixPath), numpy.load(labelsPath))
+
+    def saveDataset(self, name: str, data: csr_matrix, labels: ndarray) -> None:
+        """Writes the labels and then the matrix, each through an atomic rename"""
+        labelsPath: Path = self.directory / f"{name}.labels.npy"
+        with open(f"{labelsPath}.tmp", "wb") as labelsFile:
+            numpy.save(labelsFile, numpy.asarray(labels))
+            labelsFile.close()
+        replace(f"{labelsPath}.tmp", labelsPath)
+
+        matrixPath: Path = self.directory / f"{name}.npz"
+        with open(f"{matrixPath}.tmp", "wb") as matrixFile:
+            save_npz(matrixFile, csr_matrix(data))
+            matrixFile.close()
+        replace(f"{matrixPath}.tmp", matrixPath)
 
-    for document in tdfDict:
-        c: Counter = Counter(document.split(" "))
-        for word in wordSet:
-            tdfDict[document].append(c[word])
-        tdfList.append(tdfDict[document])
+    def loadReducer(self, reducer: SparseReducer) -> bool:
+        """Loads the cached reducer into reducer, returning False on a miss"""
+        reducerPath: Path = self.directory / "reducer.npz"
 
-    return tdfList
+        if not reducerPath.exists():
+            return False
 
+        reducer.load(reducerPath)
 
-def scaleData(
-    fitData: ndarray, transformData: ndarray, numberOfComponents: int = 10
-) -> ndarray:
-    scaler: StandardScaler = StandardScaler()
-    scaler.fit(fitData)
-    scaledData: ndarray = scaler.transform(transformData)
-    pca: PCA = PCA(n_components=numberOfComponents)
-    pca.fit(X=scaledData)
+        return True
 
-    return pca.transform(X=transformData)
+    def saveReducer(self, reducer: SparseReducer) -> None:
+        reducerPath: Path = self.directory / "reducer.npz"
+
+        reducer.save(f"{reducerPath}.tmp")
+        replace(f"{reducerPath}.tmp", reducerPath)
 
 
 def createDataset(
-    positiveData: ndarray, negativeData: ndarray, wordSet: set[str]
+    positiveData: ndarray,
+    negativeData: ndarray,
+    vocabularyIndex: dict[str, int],
+    reducer: SparseReducer,
+    fitReducer: bool = False,
+    cache: FeatureCache | None = None,
+    name: str = "dataset",
 ) -> Tuple[ndarray, ndarray]:
-    positiveTDF: List[List[int]] = termDocumentFrequency(positiveData, wordSet, label=1)
-    negativeTDF: List[List[int]] = termDocumentFrequency(negativeData, wordSet, label=0)
-
-    tdf: List[List[int]] = positiveTDF + negativeTDF
-    tdfNumpy: ndarray = numpy.array(tdf)
-    rs.shuffle(tdfNumpy)
+    """Vectorizes, shuffles, and reduces a dataset
+
+    The reducer is only fitted when fitReducer is True, which should be done
+    for the training dataset so that the other datasets reuse its projection.
+    When a cache is given, the unshuffled term-document frequencies and the
+    fitted reducer are loaded from it under name if present and saved otherwise.
+    """
+    cached: Tuple[csr_matrix, ndarray] | None = None
+    if cache is not None:
+        cached = cache.loadDataset(name)
+
+    tdf: csr_matrix
+    labels: ndarray
+    if cached is None:
+        positiveTDF: csr_matrix = termDocumentFrequency(positiveData, vocabularyIndex)
+        negativeTDF: csr_matrix = termDocumentFrequency(negativeData, vocabularyIndex)
+
+        tdf = vstack((positiveTDF, negativeTDF), format="csr")
+        labels = numpy.concatenate(
+            (
+                numpy.ones(positiveTDF.shape[0], dtype=numpy.int64),
+                numpy.zeros(negativeTDF.shape[0], dtype=numpy.int64),
+            )
+        )
+
+        if cache is not None:
+            cache.saveDataset(name, tdf, labels)
+    else:
+        tdf, labels = cached
+
+    order: ndarray = rs.permutation(tdf.shape[0])
+    tdf = tdf[order]
+    labels = labels[order]
+
+    if fitReducer and (cache is None or not cache.loadReducer(reducer)):
+        reducer.fit(tdf)
+
+        if cache is not None:
+            cache.saveReducer(reducer)
+
+    return (reducer.transform(tdf), labels)
+
+
+def createVectorizer(
+    mode: str = "count",
+    wordSet: set[str] | None = None,
+    minDF: int | float = 1,
+    maxDF: int | float = 1.0,
+    maxFeatures: int | None = None,
+    numberOfFeatures: int = 1 << 20,
+) -> CountVectorizer | HashingVectorizer:
+    """Returns a vectorizer for mode, which must be fitted on the training data
+
+    - "count": counts every word in wordSet
+    - "pruned": counts the words of the training data that appear in at least
+      minDF and at most maxDF documents, keeping only the maxFeatures most
+      frequent ones
+    - "hashing": counts words into numberOfFeatures buckets by their hash, which
+      needs no vocabulary, so the dimensionality is fixed ahead of time
+    """
+    if mode == "count":
+        return CountVectorizer(
+            strip_accents="ascii", lowercase=True, analyzer="word", vocabulary=wordSet
+        )
+
+    if mode == "pruned":
+        return CountVectorizer(
+            strip_accents="ascii",
+            lowercase=True,
+            analyzer="word",
+            min_df=minDF,
+            max_df=maxDF,
+            max_features=maxFeatures,
+        )
+
+    if mode == "hashing":
+        return HashingVectorizer(
+            strip_accents="ascii",
+            lowercase=True,
+            analyzer="word",
+            n_features=numberOfFeatures,
+            alternate_sign=False,
+            norm=None,
+            dtype=numpy.float32,
+        )
+
+    raise ValueError(f"Unknown vectorizer mode: {mode}")
 
-    labels: ndarray = tdfNumpy[:, 0]
-    tdfNumpy = tdfNumpy[:, 1:]
 
-    scaledData: ndarray = scaleData(
-        fitData=tdfNumpy, transformData=tdfNumpy, numberOfComponents=100
+def createVectorizedDataset(
+    positiveData: ndarray,
+    negativeData: ndarray,
+    vectorizer: CountVectorizer | HashingVectorizer,
+    cache: FeatureCache | None = None,
+    name: str = "vectorized",
+) -> Tuple[ndarray, ndarray]:
+    if cache is not None:
+        cached: Tuple[csr_matrix, ndarray] | None = cache.loadDataset(name)
+        if cached is not None:
+            return cached
+
+    vectorizedData: csr_matrix = vectorizer.transform(chain(positiveData, negativeData))
+    labels: ndarray = numpy.concatenate(
+        (
+            numpy.ones(len(positiveData), dtype=numpy.int64),
+            numpy.zeros(len(negativeData), dtype=numpy.int64),
+        )
     )
 
-    return (scaledData, labels)
+    if cache is not None:
+        cache.saveDataset(name, vectorizedData, labels)
+
+    return (vectorizedData, labels)
 
 
-def createVectorizedDataset(
-    positiveData: ndarray, negativeData: ndarray, wordSet: set[str]
-) -> Tuple[ndarray, ndarray]:
-    vectorizer: CountVectorizer = CountVectorizer(
-        strip_accents="ascii", lowercase=True, analyzer="word", vocabulary=wordSet
+def scaleGamma(data: ndarray | csr_matrix) -> float:
+    """Returns the rbf gamma that SVC uses for gamma="scale" on data"""
+    variance: float = (
+        data.multiply(data).mean() - data.mean() ** 2
+        if issparse(data)
+        else numpy.asarray(data).var()
     )
+    return 1 / (data.shape[1] * variance) if variance != 0 else 1.0
+
+
+def kernelMatrix(data: ndarray, kernel: str, gamma: float | str = "scale") -> ndarray:
+    """Returns the SVC kernel matrix of data for the linear and rbf kernels"""
+    if kernel == "linear":
+        return linear_kernel(data)
+
+    if kernel != "rbf":
+        raise ValueError(f"Unsupported kernel: {kernel}")
 
-    vectorizedPositiveData: csr_matrix = vectorizer.fit_transform(positiveData)
-    vectorizedNegativeData: csr_matrix = vectorizer.fit_transform(negativeData)
+    if gamma == "scale":
+        gamma = scaleGamma(data)
 
-    positiveLabels: List[int] = [1 for _ in range(vectorizedPositiveData.shape[0])]
-    negativeLabels: List[int] = [0 for _ in range(vectorizedNegativeData.shape[0])]
+    return rbf_kernel(data, gamma=gamma)
 
-    vectorizedData: csr_matrix = vstack(
-        (vectorizedPositiveData, vectorizedNegativeData)
+
+def scoreFold(
+    kernel: ndarray,
+    labels: ndarray,
+    trainingIndices: ndarray,
+    testingIndices: ndarray,
+    C: float,
+    randomState: int,
+) -> float:
+    """Fits a precomputed kernel SVC on one fold and returns its accuracy"""
+    svc: SVC = SVC(C=C, kernel="precomputed", random_state=randomState)
+    svc.fit(
+        kernel[numpy.ix_(trainingIndices, trainingIndices)], labels[trainingIndices]
     )
-    labels: List[int] = positiveLabels + negativeLabels
 
-    return (vectorizedData, labels)
+    predictions: ndarray = svc.predict(
+        kernel[numpy.ix_(testingIndices, trainingIndices)]
+    )
+
+    return float((predictions == labels[testingIndices]).mean())
+
+
+class SuccessiveHalvingSearch:
+    """Searches SVC hyperparameters by successive halving
+
+    Every candidate is cross-validated on a small random sample of the data, and
+    only the best 1/factor of them move on to the next round, which uses factor
+    times as many samples. The last round uses all of the data. Within a round
+    the kernel matrix is computed once for all candidates that share a kernel
+    and gamma. When checkpointPath is set, the score of every completed fold is
+    saved to it so that an interrupted search resumes where it stopped. The
+    checkpoint records a digest of the data, labels, and fold settings, and its
+    scores are discarded when a search is fit on anything else.
+
+    Exposes best_params_, best_score_, and best_estimator_ like GridSearchCV.
+    """
+
+    def __init__(
+        self,
+        parameterGrid: List[dict],
+        cv: int = 10,
+        factor: int = 3,
+        checkpointPath: PurePath | None = None,
+        randomState: int = 42,
+        jobs: int = -1,
+    ) -> None:
+        self.parameterGrid: List[dict] = parameterGrid
+        self.cv: int = cv
+        self.factor: int = factor
+        self.checkpointPath: PurePath | None = checkpointPath
+        self.randomState: int = randomState
+        self.jobs: int = jobs
+
+        self.foldScores: dict[str, float] = {}
+        self.digest: str | None = None
+        self.best_params_: dict | None = None
+        self.best_score_: float | None = None
+        self.best_estimator_: SVC | None = None
+
+    def datasetDigest(self, data: ndarray | csr_matrix, labels: ndarray) -> str:
+        """Returns a SHA-256 digest of the data, labels, and fold settings"""
+        digest = sha256()
+        digest.update(
+            dumps(
+                obj={
+                    "shape": list(data.shape),
+                    "cv": self.cv,
+                    "randomState": self.randomState,
+                }
+            ).encode(encoding="UTF-8")
+        )
+
+        part: ndarray
+        parts: List[ndarray] = (
+            [data.data, data.indices, data.indptr]
+            if issparse(data)
+            else [numpy.asarray(data)]
+        )
+        for part in parts + [labels]:
+            digest.update(str(part.dtype).encode(encoding="UTF-8"))
+            digest.update(numpy.ascontiguousarray(part).tobytes())
+
+        return digest.hexdigest()
+
+    def loadCheckpoint(self) -> None:
+        self.foldScores = {}
+
+        if self.checkpointPath is not None and Path(self.checkpointPath).exists():
+            with open(self.checkpointPath, "r") as checkpointFile:
+                checkpoint: dict = load(checkpointFile)
+                checkpointFile.close()
+
+            if checkpoint.get("digest") == self.digest:
+                self.foldScores = checkpoint.get("foldScores", {})
+
+    def saveCheckpoint(self) -> None:
+        if self.checkpointPath is None:
+            return
+
+        tempPath: str = f"{self.checkpointPath}.tmp"
+        with open(tempPath, "w") as checkpointFile:
+            checkpointFile.write(
+                dumps(obj={"digest": self.digest, "foldScores": self.foldScores})
+            )
+            checkpointFile.close()
+
+        replace(tempPath, self.checkpointPath)
+
+    def scoreCandidates(
+        self, candidates: List[dict], data: ndarray, labels: ndarray
+    ) -> List[float]:
+        """Returns the mean cross-validation accuracy of every candidate"""
+        folds: List[Tuple[ndarray, ndarray]] = stratifiedKFold(
+            labels=labels, folds=self.cv, seed=self.randomState
+        )
+
+        foldKeys: List[List[str]] = [
+            [
+                f"{labels.shape[0]}:{dumps(obj=candidate, sort_keys=True)}:{fold}"
+                for fold in range(self.cv)
+            ]
+            for candidate in candidates
+        ]
+
+        kernels: dict[Tuple[str, float | str], List[int]] = {}
+        idx: int
+        for idx, candidate in enumerate(candidates):
+            kernels.setdefault(
+                (candidate.get("kernel", "rbf"), candidate.get("gamma", "scale")), []
+            ).append(idx)
+
+        kernelKey: Tuple[str, float | str]
+        for kernelKey, candidateIndices in kernels.items():
+            pending: List[Tuple[int, int]] = [
+                (idx, fold)
+                for idx in candidateIndices
+                for fold in range(self.cv)
+                if foldKeys[idx][fold] not in self.foldScores
+            ]
+            if len(pending) == 0:
+                continue
+
+            kernel: ndarray = kernelMatrix(data, *kernelKey)
+            results = Parallel(n_jobs=self.jobs, return_as="generator")(
+                delayed(scoreFold)(
+                    kernel,
+                    labels,
+                    folds[fold][0],
+                    folds[fold][1],
+                    candidates[idx].get("C", 1.0),
+                    self.randomState,
+                )
+                for idx, fold in pending
+            )
+
+            score: float
+            for (idx, fold), score in zip(pending, results):
+                self.foldScores[foldKeys[idx][fold]] = score
+                self.saveCheckpoint()
+
+        return [
+            float(numpy.mean([self.foldScores[key] for key in keys]))
+            for keys in foldKeys
+        ]
+
+    def fit(self, X: ndarray, y: ndarray) -> "SuccessiveHalvingSearch":
+        """Searches on X and y like GridSearchCV.fit, then refits the best candidate"""
+        data: ndarray = X
+        labels: ndarray = numpy.asarray(y)
+        candidates: List[dict] = list(ParameterGrid(self.parameterGrid))
+        rounds: int = max(1, ceil(log(len(candidates)) / log(self.factor)))
+        minimumSamples: int = 2 * self.cv * numpy.unique(labels).shape[0]
+        order: ndarray = RandomState(MT19937(self.randomState)).permutation(
+            labels.shape[0]
+        )
+
+        self.digest = self.datasetDigest(data, labels)
+        self.loadCheckpoint()
+
+        iteration: int
+        for iteration in range(rounds):
+            sampleCount: int = max(
+                labels.shape[0] // self.factor ** (rounds - 1 - iteration),
+                min(minimumSamples, labels.shape[0]),
+            )
+            samples: ndarray = order[:sampleCount]
+
+            scores: List[float] = self.scoreCandidates(
+                candidates, data[samples], labels[samples]
+            )
+            ranking: List[int] = sorted(
+                range(len(candidates)), key=lambda idx: scores[idx], reverse=True
+            )
+
+            self.best_params_ = candidates[ranking[0]]
+            self.best_score_ = scores[ranking[0]]
+            candidates = [
+                candidates[idx]
+                for idx in ranking[: ceil(len(candidates) / self.factor)]
+            ]
+
+        self.best_estimator_ = SVC(random_state=self.randomState, **self.best_params_)
+        self.best_estimator_.fit(data, labels)
+
+        return self
+
+
+def createSearch(
+    parameterGrid: List[dict],
+    method: str = "halving",
+    checkpointPath: PurePath | None = None,
+) -> GridSearchCV | SuccessiveHalvingSearch:
+    """Returns the hyperparameter search engine for method ("grid" or "halving")"""
+    if method == "grid":
+        return GridSearchCV(
+            estimator=SVC(random_state=42),
+            param_grid=parameterGrid,
+            scoring="accuracy",
+            cv=10,
+            refit=True,
+            n_jobs=-1,
+        )
+
+    if method == "halving":
+        return SuccessiveHalvingSearch(
+            parameterGrid=parameterGrid, cv=10, checkpointPath=checkpointPath
+        )
+
+    raise ValueError(f"Unknown search method: {method}")
+
+
+def createModel(
+    backend: str = "svc",
+    C: float = 1.0,
+    kernel: str = "rbf",
+    gamma: float | str = "scale",
+    alpha: float = 0.0001,
+    numberOfComponents: int = 1000,
+    data: ndarray | csr_matrix | None = None,
+) -> ClassifierMixin:
+    """Returns an unfitted classifier for backend
+
+    "svc" is a kernel SVC, whose training time grows superlinearly with the
+    number of documents. The other backends train in time linear in the number
+    of documents and accept sparse CSR input directly:
+
+    - "linear": LinearSVC solved by dual coordinate descent
+    - "sgd": a linear SVM (hinge loss) trained by SGDClassifier with alpha
+    - "nystroem": a Nystroem approximation of the rbf kernel and a LinearSVC
+    - "fourier": random Fourier features of the rbf kernel and a LinearSVC
+
+    Nystroem does not accept gamma="scale", so for "nystroem" the gamma that SVC
+    would use is computed from data, which must be the training data.
+    """
+    if backend == "svc":
+        return SVC(C=C, kernel=kernel, gamma=gamma, random_state=42)
+
+    if backend == "linear":
+        return LinearSVC(C=C, dual=True, random_state=42)
+
+    if backend == "sgd":
+        return SGDClassifier(loss="hinge", alpha=alpha, random_state=42)
+
+    if backend == "nystroem":
+        if gamma == "scale":
+            if data is None:
+                raise ValueError('The nystroem backend needs data for gamma="scale"')
+            gamma = scaleGamma(data)
+
+        return make_pipeline(
+            Nystroem(
+                kernel="rbf",
+                gamma=gamma,
+                n_components=numberOfComponents,
+                random_state=42,
+            ),
+            LinearSVC(C=C, dual=True, random_state=42),
+        )
+
+    if backend == "fourier":
+        return make_pipeline(
+            RBFSampler(gamma=gamma, n_components=numberOfComponents, random_state=42),
+            LinearSVC(C=C, dual=True, random_state=42),
+        )
+
+    raise ValueError(f"Unknown model backend: {backend}")
 
 
 def main() -> None:
@@ -149,7 +718,7 @@ def main() -> None:
     positiveData: List[str] = loadData(filepath=positivePath)
     negativeData: List[str] = loadData(filepath=negativePath)
 
-    data: List[Tuple[List[str], List[str], List[str]]] = splitData(
+    data: List[Tuple[IndexedView, IndexedView, IndexedView]] = splitData(
         positiveData, negativeData
     )
 
@@ -157,37 +726,71 @@ def main() -> None:
     negativeWordList: List[str] = createWordList(data[1][0])
     wordList: List[str] = positiveWordList + negativeWordList
     wordSet: set[str] = set(wordList)
+    vocabularyIndex: dict[str, int] = createVocabularyIndex(wordSet)
+
+    # Set "mode" to "pruned" or "hashing" to bound the number of CountVectorizer
+    # features, see createVectorizer()
+    vectorizerParameters: dict = {
+        "mode": "count",
+        "minDF": 1,
+        "maxDF": 1.0,
+        "maxFeatures": None,
+        "numberOfFeatures": 1 << 20,
+    }
+
+    cache: FeatureCache = FeatureCache(
+        inputPaths=[positivePath, negativePath],
+        parameters={
+            "randomState": 42,
+            "split": {"fractions": [0.7, 0.15, 0.15], "seed": 42},
+            "numberOfComponents": 100,
+            "vectorizer": vectorizerParameters,
+        },
+        vocabularyIndex=vocabularyIndex,
+    )
 
     ################################################################################
     # Uncomment the following to initiate grid search
 
+    reducer: SparseReducer = SparseReducer(numberOfComponents=100)
     trainingData, trainingLabels = createDataset(
-        positiveData=data[0][0], negativeData=data[1][0], wordSet=wordSet
+        positiveData=data[0][0],
+        negativeData=data[1][0],
+        vocabularyIndex=vocabularyIndex,
+        reducer=reducer,
+        fitReducer=True,
+        cache=cache,
+        name="training",
     )
     developmentData, developmentLabels = createDataset(
-        positiveData=data[0][1], negativeData=data[1][1], wordSet=wordSet
+        positiveData=data[0][1],
+        negativeData=data[1][1],
+        vocabularyIndex=vocabularyIndex,
+        reducer=reducer,
+        cache=cache,
+        name="development",
     )
     testData, testLabels = createDataset(
-        positiveData=data[0][2], negativeData=data[1][2], wordSet=wordSet
+        positiveData=data[0][2],
+        negativeData=data[1][2],
+        vocabularyIndex=vocabularyIndex,
+        reducer=reducer,
+        cache=cache,
+        name="test",
     )
-    pipeline: Pipeline = make_pipeline(SVC(random_state=42))
-
     parameterRange: List[float] = [0.0001, 0.001, 0.01, 0.1, 1.0, 10.0, 100.0, 1000.0]
     parameterGrid: List[dict] = [
-        {"svc__C": parameterRange, "svc__kernel": ["linear"]},
+        {"C": parameterRange, "kernel": ["linear"]},
         {
-            "svc__C": parameterRange,
-            "svc__gamma": parameterRange,
-            "svc__kernel": ["rbf"],
+            "C": parameterRange,
+            "gamma": parameterRange,
+            "kernel": ["rbf"],
         },
     ]
-    gridSearch: GridSearchCV = GridSearchCV(
-        estimator=pipeline,
-        param_grid=parameterGrid,
-        scoring="accuracy",
-        cv=10,
-        refit=True,
-        n_jobs=-1,
+    gridSearch: GridSearchCV | SuccessiveHalvingSearch = createSearch(
+        parameterGrid=parameterGrid,
+        method="halving",
+        checkpointPath=PurePath(cache.directory, "searchCheckpoint.json"),
     )
     gridSearch.fit(X=trainingData, y=trainingLabels)
     bestModel = gridSearch.best_estimator_
@@ -209,18 +812,41 @@ def main() -> None:
 
     ################################################################################
     # Uncomment for vectorization with CountVectorizer()
+    vectorizer: CountVectorizer | HashingVectorizer = createVectorizer(
+        wordSet=wordSet, **vectorizerParameters
+    )
+    vectorizer.fit(chain(data[0][0], data[1][0]))
+
     trainingData, trainingLabels = createVectorizedDataset(
-        positiveData=data[0][0], negativeData=data[1][0], wordSet=wordSet
+        positiveData=data[0][0],
+        negativeData=data[1][0],
+        vectorizer=vectorizer,
+        cache=cache,
+        name="trainingVectorized",
     )
     developmentData, developmentLabels = createVectorizedDataset(
-        positiveData=data[0][1], negativeData=data[1][1], wordSet=wordSet
+        positiveData=data[0][1],
+        negativeData=data[1][1],
+        vectorizer=vectorizer,
+        cache=cache,
+        name="developmentVectorized",
     )
     testData, testLabels = createVectorizedDataset(
-        positiveData=data[0][2], negativeData=data[1][2], wordSet=wordSet
+        positiveData=data[0][2],
+        negativeData=data[1][2],
+        vectorizer=vectorizer,
+        cache=cache,
+        name="testVectorized",
     )
 
+    # Set modelBackend to "linear", "sgd", "nystroem", or "fourier" to train a
+    # linear time model on the sparse features instead of a kernel SVC
+    modelBackend: str = "svc"
+
     # bestModel: SVC = SVC(C=100, gamma=0.1, random_state=42)
-    bestModel = gridSearch.best_estimator_
+    bestModel = createModel(
+        backend=modelBackend, data=trainingData, **gridSearch.best_params_
+    )
     bestModel.fit(trainingData, trainingLabels)
     # print(bestModel.score(trainingData, trainingLabels))
     # print(bestModel.score(developmentData, developmentLabels))
@@ -1,34 +1,98 @@
 from argparse import ArgumentParser, BooleanOptionalAction, Namespace
-from typing import List, Tuple
+from json import dumps, load
+from os import cpu_count, makedirs, replace
+from os.path import exists, getmtime, getsize, join
+from shutil import rmtree
+from time import perf_counter
+from typing import Callable, List, Tuple
 
+import numpy
 from gensim import downloader, utils
 from gensim.models import KeyedVectors, Word2Vec
+from gensim.models.callbacks import CallbackAny2Vec
+from gensim.test.utils import datapath
+from numpy import float32, int32, int64, ndarray
+from numpy.lib.format import open_memmap
 from progress.bar import Bar
+from scipy.sparse import csr_matrix
 from scipy.stats import spearmanr
 from scipy.stats._stats_py import SignificanceResult
 
+from nlp.common.corpus import Corpus
+
+
+def preprocessCorpus(
+    corpusPath: str = "wikitext-103/wiki.train.tokens",
+    outputPath: str | None = None,
+    progressStep: int = 1 << 20,
+) -> str:
+    """Writes the preprocessed sentences of a corpus to outputPath, one per line
+
+    Each line holds the space separated tokens of one sentence, which is the
+    format that gensim's LineSentence and corpus_file arguments expect. The
+    file is only rebuilt when it is missing or older than the corpus, and
+    outputPath defaults to the corpus path with a .preprocessed suffix.
+    Progress is reported by byte offset every progressStep bytes.
+    """
+    outputPath = outputPath or f"{corpusPath}.preprocessed"
+
+    if exists(outputPath) and getmtime(outputPath) >= getmtime(corpusPath):
+        return outputPath
+
+    tempPath: str = f"{outputPath}.tmp"
+    bytesRead: int = 0
+
+    with Bar(
+        f"Preprocessing {corpusPath}...",
+        max=getsize(corpusPath),
+        suffix="%(percent).1f%%",
+    ) as bar, open(corpusPath, "rb") as corpus, open(
+        tempPath, "w", encoding="UTF-8"
+    ) as output:
+        rawLine: bytes
+        for rawLine in corpus:
+            bytesRead += len(rawLine)
+            if bytesRead >= progressStep:
+                bar.next(bytesRead)
+                bytesRead = 0
+
+            line: str = rawLine.decode(encoding="UTF-8")
+            if (line.isspace()) or line[0:1] == "=":
+                continue
+
+            tokens: List[str] = utils.simple_preprocess(line.strip())
+            if len(tokens) > 0:
+                output.write(" ".join(tokens) + "\n")
+
+        bar.next(bytesRead)
+
+    replace(tempPath, outputPath)
+
+    return outputPath
+
 
 class MyCorpus:
     """An iterator that yields sentences (lists of str).
     Code from https://radimrehurek.com/gensim/auto_examples/tutorials/run_word2vec.html#sphx-glr-auto-examples-tutorials-run-word2vec-py
+
+    Sentences are read from the file written by preprocessCorpus(), so each
+    epoch only splits lines rather than preprocessing the corpus again.
     """
 
     epochCount: int = 1
 
+    def __init__(self, corpusPath: str = "wikitext-103/wiki.train.tokens") -> None:
+        self.corpusPath: str = corpusPath
+
+    def __len__(self) -> int:
+        return len(Corpus(filepath=preprocessCorpus(corpusPath=self.corpusPath)))
+
     def __iter__(self):
+        corpus: Corpus = Corpus(filepath=preprocessCorpus(corpusPath=self.corpusPath))
+
         line: str
-        corpus_path = "wikitext-103/wiki.train.tokens"
-        # https://stackoverflow.com/a/1019572
-        num_lines = sum(1 for line in open(corpus_path))
-
-        with Bar(f"Iterating through {corpus_path}...", max=num_lines) as bar:
-            for line in open(corpus_path):
-                if (line.isspace()) or line[0:1] == "=":
-                    bar.next()
-                    continue
-                line: str = line.strip()
-                yield utils.simple_preprocess(line)
-                bar.next()
+        for line in corpus:
+            yield line.split()
 
         self.epochCount += 1
 
@@ -49,25 +113,1121 @@ def getArgs() -> Namespace:
         action=BooleanOptionalAction,
         help="Download Google News Word2Vec model and save to disk",
     )
+    parser.add_argument(
+        "--build-index",
+        action=BooleanOptionalAction,
+        help="Build an approximate nearest neighbour index of the Google News model",
+    )
+    parser.add_argument(
+        "--benchmark-index",
+        action=BooleanOptionalAction,
+        help="Compare the recall and latency of the index against exact search",
+    )
+    parser.add_argument(
+        "--list-count",
+        type=int,
+        default=4096,
+        help="Number of clusters in the index (default: 4096)",
+    )
+    parser.add_argument(
+        "--probe-count",
+        type=int,
+        default=8,
+        help="Number of clusters searched per query, trading latency for recall (default: 8)",
+    )
+    parser.add_argument(
+        "--build-store",
+        action=BooleanOptionalAction,
+        help="Save the Google News model as a memory-mapped embedding store",
+    )
+    parser.add_argument(
+        "--store-dtype",
+        type=str,
+        choices=["float32", "float16", "int8"],
+        default="float16",
+        help="Precision of the vectors in the embedding store (default: float16)",
+    )
+    parser.add_argument(
+        "--analogies",
+        type=str,
+        default=datapath("questions-words.txt"),
+        help="Analogy questions in the Google analogy test set format (default: gensim's copy of it)",
+    )
+    parser.add_argument(
+        "--analogy-method",
+        type=str,
+        choices=["add", "mul"],
+        default="add",
+        help="Rank analogy answers with 3CosAdd or 3CosMul (default: add)",
+    )
+    parser.add_argument(
+        "--config",
+        type=str,
+        help="JSON file of training options, which are overridden by the command line",
+    )
+    parser.add_argument(
+        "--vector-size",
+        type=int,
+        default=100,
+        help="Dimensionality of the word vectors (default: 100)",
+    )
+    parser.add_argument(
+        "--window",
+        type=int,
+        default=5,
+        help="Maximum distance between the current and predicted word (default: 5)",
+    )
+    parser.add_argument(
+        "--min-count",
+        type=int,
+        default=5,
+        help="Ignore words that appear fewer times than this (default: 5)",
+    )
+    parser.add_argument(
+        "--epochs",
+        type=int,
+        default=5,
+        help="Number of passes over the corpus (default: 5)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=cpu_count() or 1,
+        help="Number of worker threads (default: the number of CPUs)",
+    )
+    parser.add_argument(
+        "--skip-gram",
+        action=BooleanOptionalAction,
+        default=False,
+        help="Train with skip-gram instead of CBOW",
+    )
+    parser.add_argument(
+        "--checkpoint-directory",
+        type=str,
+        default="models/checkpoints",
+        help="Directory to save a checkpoint to after every epoch",
+    )
+    parser.add_argument(
+        "--resume",
+        action=BooleanOptionalAction,
+        default=False,
+        help="Resume training from the last checkpoint",
+    )
+
+    configArgs, _ = parser.parse_known_args()
+    if configArgs.config is not None:
+        with open(configArgs.config, "r") as configFile:
+            config: dict = load(configFile)
+            configFile.close()
+
+        parser.set_defaults(**{key.replace("-", "_"): config[key] for key in config})
 
     return parser.parse_args()
 
 
-def train(modelFilePath: str = "models/w2v.gensim") -> None:
-    sentences: MyCorpus = MyCorpus()
+class EpochCheckpoint(CallbackAny2Vec):
+    """Saves the model and reports its throughput after every epoch
+
+    Checkpoints alternate between two files so that a crash while saving never
+    corrupts the last complete checkpoint. checkpoint.json records which file
+    holds the latest checkpoint and how many epochs it has completed, along with
+    the initial learning rate and total epochs of the whole run. Word2Vec.train()
+    overwrites both on the model with the values for the epochs it was asked to
+    run, so they cannot be read back from a resumed model.
+    """
+
+    def __init__(
+        self,
+        checkpointDirectory: str,
+        alpha: float,
+        epochs: int,
+        completedEpochs: int = 0,
+    ) -> None:
+        self.checkpointDirectory: str = checkpointDirectory
+        self.alpha: float = alpha
+        self.epochs: int = epochs
+        self.epoch: int = completedEpochs
+        self.epochStart: float = 0
+        self.wordsPerSecond: List[float] = []
+
+        makedirs(checkpointDirectory, exist_ok=True)
+
+    def on_epoch_begin(self, model: Word2Vec) -> None:
+        self.epochStart = perf_counter()
+
+    def on_epoch_end(self, model: Word2Vec) -> None:
+        self.epoch += 1
+        elapsed: float = perf_counter() - self.epochStart
+        wordsPerSecond: float = model.corpus_total_words / elapsed
+        self.wordsPerSecond.append(wordsPerSecond)
+
+        print(f"Epoch {self.epoch}: {elapsed:.1f}s, {wordsPerSecond:,.0f} words/sec")
+
+        checkpointPath: str = join(
+            self.checkpointDirectory, f"w2v.{self.epoch % 2}.gensim"
+        )
+        model.save(checkpointPath)
+
+        pointerPath: str = join(self.checkpointDirectory, "checkpoint.json")
+        with open(f"{pointerPath}.tmp", "w") as pointerFile:
+            pointerFile.write(
+                dumps(
+                    obj={
+                        "path": checkpointPath,
+                        "epoch": self.epoch,
+                        "alpha": self.alpha,
+                        "epochs": self.epochs,
+                    },
+                    indent=4,
+                )
+            )
+            pointerFile.close()
+
+        replace(f"{pointerPath}.tmp", pointerPath)
+
 
-    print("Creating Word2Vec model...")
-    model: Word2Vec = Word2Vec(sentences=sentences)
+def loadCheckpoint(checkpointDirectory: str) -> Tuple[Word2Vec, int] | None:
+    """Returns the latest checkpointed model and its completed epochs, if any
+
+    The model's alpha and epochs are reset to those of the whole run, as
+    recorded by EpochCheckpoint.
+    """
+    pointerPath: str = join(checkpointDirectory, "checkpoint.json")
+    if not exists(pointerPath):
+        return None
+
+    with open(pointerPath, "r") as pointerFile:
+        pointer: dict = load(pointerFile)
+        pointerFile.close()
+
+    model: Word2Vec = Word2Vec.load(pointer["path"])
+    model.alpha = pointer.get("alpha", model.alpha)
+    model.epochs = pointer.get("epochs", model.epochs)
+
+    return (model, pointer["epoch"])
+
+
+def train(
+    modelFilePath: str = "models/w2v.gensim",
+    vectorSize: int = 100,
+    window: int = 5,
+    minCount: int = 5,
+    epochs: int = 5,
+    workers: int | None = None,
+    skipGram: bool = False,
+    checkpointDirectory: str = "models/checkpoints",
+    resume: bool = False,
+) -> None:
+    corpusFilePath: str = preprocessCorpus()
+
+    checkpoint: Tuple[Word2Vec, int] | None = None
+    if resume:
+        checkpoint = loadCheckpoint(checkpointDirectory)
+
+    model: Word2Vec
+    completedEpochs: int = 0
+    if checkpoint is None:
+        print("Creating Word2Vec model...")
+        model = Word2Vec(
+            vector_size=vectorSize,
+            window=window,
+            min_count=minCount,
+            epochs=epochs,
+            workers=workers or cpu_count() or 1,
+            sg=int(skipGram),
+        )
+        model.build_vocab(corpus_file=corpusFilePath)
+    else:
+        model, completedEpochs = checkpoint
+        model.epochs = epochs
+        model.workers = workers or cpu_count() or 1
+        print(f"Resuming Word2Vec model after epoch {completedEpochs}...")
+
+    # Continue the learning rate decay from where the checkpoint stopped
+    alpha: float = model.alpha
+    totalEpochs: int = model.epochs
+    startAlpha: float = alpha - (alpha - model.min_alpha) * (
+        completedEpochs / totalEpochs
+    )
+
+    if completedEpochs < totalEpochs:
+        model.train(
+            corpus_file=corpusFilePath,
+            total_words=model.corpus_total_words,
+            epochs=totalEpochs - completedEpochs,
+            start_alpha=startAlpha,
+            end_alpha=model.min_alpha,
+            callbacks=[
+                EpochCheckpoint(
+                    checkpointDirectory=checkpointDirectory,
+                    alpha=alpha,
+                    epochs=totalEpochs,
+                    completedEpochs=completedEpochs,
+                )
+            ],
+        )
+
+    # train() leaves the start alpha and epochs of this call on the model
+    model.alpha = alpha
+    model.epochs = totalEpochs
 
     print(f"Saving model to {modelFilePath}...")
     model.save(modelFilePath)
 
 
+def normalizeRows(vectors: ndarray) -> ndarray:
+    """Returns a float32 copy of vectors with every non-zero row at unit length"""
+    vectors = numpy.array(vectors, dtype=float32)
+    norms: ndarray = numpy.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    vectors /= norms
+    return vectors
+
+
+def assignLists(vectors: ndarray, centroids: ndarray, blockSize: int) -> ndarray:
+    """Returns the index of the most similar centroid for every vector"""
+    assignments: ndarray = numpy.empty(vectors.shape[0], dtype=int32)
+
+    start: int
+    for start in range(0, vectors.shape[0], blockSize):
+        block: ndarray = normalizeRows(vectors[start : start + blockSize])
+        assignments[start : start + blockSize] = (block @ centroids.T).argmax(axis=1)
+
+    return assignments
+
+
+class IVFIndex:
+    """An inverted file index for approximate cosine similarity search
+
+    The normalised vectors are clustered with spherical k-means and stored
+    contiguously by cluster. A query only scores the vectors of the probeCount
+    clusters whose centroids are most similar to it, so raising probeCount
+    trades latency for recall. Indexes are saved as a directory of .npy files
+    and the vectors are memory-mapped when loaded.
+    """
+
+    def __init__(
+        self,
+        centroids: ndarray,
+        listOffsets: ndarray,
+        listIDs: ndarray,
+        listVectors: ndarray,
+        probeCount: int = 8,
+    ) -> None:
+        self.centroids: ndarray = centroids
+        self.listOffsets: ndarray = listOffsets
+        self.listIDs: ndarray = listIDs
+        self.listVectors: ndarray = listVectors
+        self.probeCount: int = probeCount
+
+    @classmethod
+    def build(
+        cls,
+        wv: KeyedVectors,
+        directory: str,
+        listCount: int = 4096,
+        sampleSize: int = 1 << 18,
+        iterations: int = 10,
+        blockSize: int = 1 << 16,
+        probeCount: int = 8,
+        seed: int = 42,
+    ) -> "IVFIndex":
+        """Clusters the vectors of wv and writes the index to directory
+
+        The centroids are trained on a random sample of sampleSize vectors, and
+        the vectors are then assigned and written blockSize rows at a time so
+        that the full matrix is never copied into memory.
+        """
+        vectorCount: int = wv.vectors.shape[0]
+        listCount = min(listCount, vectorCount)
+        rng: numpy.random.Generator = numpy.random.default_rng(seed)
+
+        sampleIDs: ndarray = numpy.sort(
+            rng.choice(vectorCount, size=min(sampleSize, vectorCount), replace=False)
+        )
+        sample: ndarray = normalizeRows(wv.vectors[sampleIDs])
+        centroids: ndarray = sample[
+            rng.choice(sample.shape[0], size=listCount, replace=False)
+        ]
+
+        with Bar("Training centroids...", max=iterations) as bar:
+            _: int
+            for _ in range(iterations):
+                assignments: ndarray = assignLists(sample, centroids, blockSize)
+                members: csr_matrix = csr_matrix(
+                    (
+                        numpy.ones(sample.shape[0], dtype=float32),
+                        (assignments, numpy.arange(sample.shape[0])),
+                    ),
+                    shape=(listCount, sample.shape[0]),
+                )
+                sums: ndarray = numpy.asarray(members @ sample)
+
+                empty: ndarray = numpy.flatnonzero(members.getnnz(axis=1) == 0)
+                sums[empty] = sample[rng.choice(sample.shape[0], size=empty.shape[0])]
+
+                centroids = normalizeRows(sums)
+                bar.next()
+
+        print("Assigning vectors to lists...")
+        assignments = assignLists(wv.vectors, centroids, blockSize)
+        listIDs: ndarray = numpy.argsort(assignments, kind="stable").astype(int32)
+        listOffsets: ndarray = numpy.zeros(listCount + 1, dtype=int64)
+        numpy.cumsum(
+            numpy.bincount(assignments, minlength=listCount), out=listOffsets[1:]
+        )
+
+        tempDirectory: str = f"{directory}.tmp"
+        rmtree(tempDirectory, ignore_errors=True)
+        makedirs(tempDirectory)
+
+        numpy.save(join(tempDirectory, "centroids.npy"), centroids)
+        numpy.save(join(tempDirectory, "offsets.npy"), listOffsets)
+        numpy.save(join(tempDirectory, "ids.npy"), listIDs)
+
+        listVectors: ndarray = open_memmap(
+            join(tempDirectory, "vectors.npy"),
+            mode="w+",
+            dtype=float32,
+            shape=(vectorCount, wv.vectors.shape[1]),
+        )
+        start: int
+        for start in range(0, vectorCount, blockSize):
+            blockIDs: ndarray = listIDs[start : start + blockSize]
+            listVectors[start : start + blockSize] = normalizeRows(wv.vectors[blockIDs])
+        listVectors.flush()
+        del listVectors
+
+        rmtree(directory, ignore_errors=True)
+        replace(tempDirectory, directory)
+
+        return cls.load(directory=directory, probeCount=probeCount)
+
+    @classmethod
+    def load(cls, directory: str, probeCount: int = 8) -> "IVFIndex":
+        return cls(
+            centroids=numpy.load(join(directory, "centroids.npy")),
+            listOffsets=numpy.load(join(directory, "offsets.npy")),
+            listIDs=numpy.load(join(directory, "ids.npy"), mmap_mode="r"),
+            listVectors=numpy.load(join(directory, "vectors.npy"), mmap_mode="r"),
+            probeCount=probeCount,
+        )
+
+    def search(
+        self, vector: ndarray, topN: int = 10, probeCount: int | None = None
+    ) -> Tuple[ndarray, ndarray]:
+        """Returns the IDs and cosine similarities of the topN nearest vectors"""
+        query: ndarray = normalizeRows(numpy.reshape(vector, (1, -1)))[0]
+        probeCount = min(probeCount or self.probeCount, self.centroids.shape[0])
+
+        centroidScores: ndarray = self.centroids @ query
+        probes: ndarray = numpy.argpartition(-centroidScores, probeCount - 1)
+        probes = numpy.sort(probes[:probeCount])
+
+        spans: List[slice] = [
+            slice(self.listOffsets[probe], self.listOffsets[probe + 1])
+            for probe in probes
+        ]
+        scores: ndarray = numpy.concatenate(
+            [self.listVectors[span] @ query for span in spans]
+        )
+        ids: ndarray = numpy.concatenate([self.listIDs[span] for span in spans])
+
+        topN = min(topN, scores.shape[0])
+        if topN == 0:
+            return (ids, scores)
+
+        top: ndarray = numpy.argpartition(-scores, topN - 1)[:topN]
+        top = top[numpy.argsort(-scores[top], kind="stable")]
+        return (ids[top], scores[top])
+
+
+def benchmarkIndex(
+    wv: KeyedVectors,
+    index: IVFIndex,
+    queryCount: int = 200,
+    topN: int = 100,
+    probeCounts: Tuple[int, ...] = (1, 2, 4, 8, 16, 32, 64),
+    seed: int = 42,
+) -> List[dict]:
+    """Compares the recall and latency of index against exact search
+
+    Recall is the fraction of the exact topN neighbours that the index also
+    returns, averaged over queryCount randomly chosen vocabulary words.
+    """
+    rng: numpy.random.Generator = numpy.random.default_rng(seed)
+    queryIDs: ndarray = rng.choice(
+        len(wv), size=min(queryCount, len(wv)), replace=False
+    )
+
+    exactNeighbours: List[set] = []
+    latencies: List[float] = []
+
+    queryID: int
+    for queryID in queryIDs:
+        start: float = perf_counter()
+        similarWords: List[Tuple[str, float]] = wv.most_similar(
+            [wv.vectors[queryID]], topn=topN
+        )
+        latencies.append(perf_counter() - start)
+        exactNeighbours.append({wv.key_to_index[word] for word, _ in similarWords})
+
+    results: List[dict] = [
+        {
+            "probeCount": None,
+            "recall": 1.0,
+            "p50Milliseconds": numpy.percentile(latencies, 50) * 1000,
+            "p99Milliseconds": numpy.percentile(latencies, 99) * 1000,
+        }
+    ]
+
+    probeCount: int
+    for probeCount in probeCounts:
+        latencies = []
+        recalls: List[float] = []
+
+        queryNumber: int
+        for queryNumber, queryID in enumerate(queryIDs):
+            start = perf_counter()
+            ids, _ = index.search(wv.vectors[queryID], topN=topN, probeCount=probeCount)
+            latencies.append(perf_counter() - start)
+
+            exact: set = exactNeighbours[queryNumber]
+            recalls.append(len(exact.intersection(ids.tolist())) / max(len(exact), 1))
+
+        results.append(
+            {
+                "probeCount": probeCount,
+                "recall": float(numpy.mean(recalls)),
+                "p50Milliseconds": numpy.percentile(latencies, 50) * 1000,
+                "p99Milliseconds": numpy.percentile(latencies, 99) * 1000,
+            }
+        )
+
+    print(f"{'probes':>8} {'recall':>8} {'p50 ms':>10} {'p99 ms':>10}")
+    result: dict
+    for result in results:
+        probes: str = "exact" if result["probeCount"] is None else result["probeCount"]
+        print(
+            f"{probes:>8} {result['recall']:>8.3f} "
+            f"{result['p50Milliseconds']:>10.3f} {result['p99Milliseconds']:>10.3f}"
+        )
+
+    return results
+
+
+class StoredKeys:
+    """The keys of an EmbeddingStore, memory-mapped as fixed width UTF-8 bytes
+
+    Keys are looked up by binary search over a sorted copy of the keys rather
+    than a dict, so every process shares the same pages of both arrays.
+    """
+
+    def __init__(self, keys: ndarray, sortedKeys: ndarray, sortedIDs: ndarray) -> None:
+        self.keys: ndarray = keys
+        self.sortedKeys: ndarray = sortedKeys
+        self.sortedIDs: ndarray = sortedIDs
+
+    def __len__(self) -> int:
+        return self.keys.shape[0]
+
+    def __getitem__(self, i: int) -> str:
+        return bytes(self.keys[i]).decode("utf-8")
+
+    def lookup(self, words: List[str]) -> ndarray:
+        """Returns the ID of every word, or -1 if a word is not a key"""
+        encoded: List[bytes] = [word.encode("utf-8") for word in words]
+        fits: ndarray = numpy.array(
+            [len(word) <= self.keys.itemsize for word in encoded], dtype=bool
+        )
+        queries: ndarray = numpy.array(encoded, dtype=self.keys.dtype)
+
+        positions: ndarray = numpy.searchsorted(self.sortedKeys, queries)
+        positions = numpy.minimum(positions, max(len(self) - 1, 0))
+
+        ids: ndarray = numpy.full(len(words), -1, dtype=int64)
+        if len(self) == 0:
+            return ids
+
+        found: ndarray = fits & (self.sortedKeys[positions] == queries)
+        ids[found] = self.sortedIDs[positions[found]]
+        return ids
+
+
+class EmbeddingStore:
+    """Word vectors saved as raw arrays that every process memory-maps
+
+    Vectors are stored as float32, float16, or int8. int8 vectors are scaled
+    per row so that the largest component maps to 127, and the scales are kept
+    alongside them. The L2 norms of the original vectors are precomputed so
+    that normalising a row never needs the full precision vector. Stores
+    provide the parts of the KeyedVectors interface that the queries here use.
+    """
+
+    def __init__(
+        self,
+        index_to_key: StoredKeys,
+        vectors: ndarray,
+        norms: ndarray,
+        scales: ndarray | None = None,
+    ) -> None:
+        self.index_to_key: StoredKeys = index_to_key
+        self.vectors: ndarray = vectors
+        self.norms: ndarray = norms
+        self.scales: ndarray | None = scales
+
+    @classmethod
+    def build(
+        cls,
+        wv: KeyedVectors,
+        directory: str,
+        dtype: str = "float16",
+        blockSize: int = 1 << 16,
+    ) -> "EmbeddingStore":
+        """Writes the vectors and keys of wv to directory, blockSize rows at a time"""
+        if dtype not in ("float32", "float16", "int8"):
+            raise ValueError(f"Unsupported embedding store dtype: {dtype}")
+
+        tempDirectory: str = f"{directory}.tmp"
+        rmtree(tempDirectory, ignore_errors=True)
+        makedirs(tempDirectory)
+
+        keys: ndarray = numpy.array(
+            [key.encode("utf-8") for key in wv.index_to_key], dtype=bytes
+        )
+        sortedIDs: ndarray = numpy.argsort(keys, kind="stable")
+        numpy.save(join(tempDirectory, "keys.npy"), keys)
+        numpy.save(join(tempDirectory, "sortedKeys.npy"), keys[sortedIDs])
+        numpy.save(join(tempDirectory, "sortedIDs.npy"), sortedIDs.astype(int64))
+        del keys
+
+        shape: Tuple[int, int] = wv.vectors.shape
+        vectors: ndarray = open_memmap(
+            join(tempDirectory, "vectors.npy"), mode="w+", dtype=dtype, shape=shape
+        )
+        norms: ndarray = open_memmap(
+            join(tempDirectory, "norms.npy"), mode="w+", dtype=float32, shape=shape[:1]
+        )
+        scales: ndarray | None = None
+        if dtype == "int8":
+            scales = open_memmap(
+                join(tempDirectory, "scales.npy"),
+                mode="w+",
+                dtype=float32,
+                shape=shape[:1],
+            )
+
+        start: int
+        for start in range(0, shape[0], blockSize):
+            block: ndarray = numpy.asarray(
+                wv.vectors[start : start + blockSize], dtype=float32
+            )
+            norms[start : start + blockSize] = numpy.linalg.norm(block, axis=1)
+
+            if scales is None:
+                vectors[start : start + blockSize] = block
+                continue
+
+            blockScales: ndarray = numpy.abs(block).max(axis=1, initial=0) / 127
+            blockScales[blockScales == 0] = 1
+            scales[start : start + blockSize] = blockScales
+            vectors[start : start + blockSize] = numpy.rint(
+                block / blockScales[:, None]
+            )
+
+        vectors.flush()
+        norms.flush()
+        if scales is not None:
+            scales.flush()
+        del vectors, norms, scales
+
+        rmtree(directory, ignore_errors=True)
+        replace(tempDirectory, directory)
+
+        return cls.load(directory)
+
+    @classmethod
+    def load(cls, directory: str) -> "EmbeddingStore":
+        scalesPath: str = join(directory, "scales.npy")
+
+        return cls(
+            index_to_key=StoredKeys(
+                keys=numpy.load(join(directory, "keys.npy"), mmap_mode="r"),
+                sortedKeys=numpy.load(join(directory, "sortedKeys.npy"), mmap_mode="r"),
+                sortedIDs=numpy.load(join(directory, "sortedIDs.npy"), mmap_mode="r"),
+            ),
+            vectors=numpy.load(join(directory, "vectors.npy"), mmap_mode="r"),
+            norms=numpy.load(join(directory, "norms.npy"), mmap_mode="r"),
+            scales=numpy.load(scalesPath, mmap_mode="r")
+            if exists(scalesPath)
+            else None,
+        )
+
+    def __len__(self) -> int:
+        return len(self.index_to_key)
+
+    def __contains__(self, word: str) -> bool:
+        return bool(self.index_to_key.lookup([word])[0] >= 0)
+
+    def __getitem__(self, words: str | List[str]) -> ndarray:
+        if isinstance(words, str):
+            return self[[words]][0]
+
+        ids: ndarray = self.index_to_key.lookup(words)
+        if (ids < 0).any():
+            raise KeyError(f"Key '{words[int(numpy.argmin(ids))]}' not present")
+
+        return self.dequantize(ids)
+
+    def dequantize(self, rows: ndarray | slice) -> ndarray:
+        """Returns the rows of the store as float32 vectors"""
+        vectors: ndarray = numpy.array(self.vectors[rows], dtype=float32)
+        if self.scales is not None:
+            vectors *= numpy.asarray(self.scales[rows])[:, None]
+        return vectors
+
+    def normalizedVectors(self, rows: ndarray | slice) -> ndarray:
+        """Returns the rows of the store divided by their precomputed norms"""
+        vectors: ndarray = self.dequantize(rows)
+        norms: ndarray = numpy.array(self.norms[rows])
+        norms[norms == 0] = 1
+        vectors /= norms[:, None]
+        return vectors
+
+    def similarity(self, w1: str, w2: str) -> float:
+        ids: ndarray = self.index_to_key.lookup([w1, w2])
+        if (ids < 0).any():
+            raise KeyError(f"Key '{w1 if ids[0] < 0 else w2}' not present")
+
+        vectors: ndarray = self.normalizedVectors(ids)
+        return float(vectors[0] @ vectors[1])
+
+
+def normalizedVectors(
+    wv: KeyedVectors | EmbeddingStore, rows: ndarray | slice
+) -> ndarray:
+    """Returns the unit length float32 rows of a model or embedding store"""
+    if isinstance(wv, EmbeddingStore):
+        return wv.normalizedVectors(rows)
+    return normalizeRows(wv.vectors[rows])
+
+
+def blockedTopN(
+    wv: KeyedVectors | EmbeddingStore,
+    queryCount: int,
+    scoreBlock: Callable[[ndarray, int, int, int], ndarray],
+    topN: int = 10,
+    vocabularySize: int | None = None,
+    blockSize: int = 1 << 14,
+    queryBlockSize: int = 1024,
+) -> Tuple[ndarray, ndarray]:
+    """Returns the IDs and scores of the topN highest scoring words per query
+
+    The first vocabularySize normalised vectors of wv are read in a single pass
+    of blockSize rows. scoreBlock(block, start, queryStart, queryStop) scores
+    the block, whose first row is word start, against queries queryStart to
+    queryStop, and the scores are merged into the running top topN with
+    argpartition. Apart from the scores of one block, memory is bounded by
+    queryBlockSize * topN rather than the vocabulary size, and rows are sorted
+    by descending score.
+    """
+    vocabularySize = min(vocabularySize or len(wv), len(wv))
+    topN = min(topN, vocabularySize)
+
+    bestIDs: ndarray = numpy.empty((queryCount, 0), dtype=int64)
+    bestScores: ndarray = numpy.empty((queryCount, 0), dtype=float32)
+
+    start: int
+    for start in range(0, vocabularySize, blockSize):
+        block: ndarray = normalizedVectors(
+            wv, slice(start, min(start + blockSize, vocabularySize))
+        )
+        blockIDs: List[ndarray] = []
+        blockScores: List[ndarray] = []
+
+        queryStart: int
+        for queryStart in range(0, queryCount, queryBlockSize):
+            queryStop: int = min(queryStart + queryBlockSize, queryCount)
+            scores: ndarray = scoreBlock(block, start, queryStart, queryStop)
+
+            # Keep the block's own top topN first, so that IDs are only built for
+            # the kept columns rather than for the whole block. The kept columns
+            # are copied so they do not hold on to the block sized argpartition
+            keep: ndarray
+            if scores.shape[1] > topN:
+                keep = numpy.argpartition(scores, -topN, axis=1)[:, -topN:].copy()
+                scores = numpy.take_along_axis(scores, keep, axis=1)
+            else:
+                keep = numpy.broadcast_to(numpy.arange(scores.shape[1]), scores.shape)
+
+            scores = numpy.hstack([bestScores[queryStart:queryStop], scores])
+            ids: ndarray = numpy.hstack([bestIDs[queryStart:queryStop], keep + start])
+
+            if scores.shape[1] > topN:
+                keep = numpy.argpartition(scores, -topN, axis=1)[:, -topN:]
+                scores = numpy.take_along_axis(scores, keep, axis=1)
+                ids = numpy.take_along_axis(ids, keep, axis=1)
+
+            blockIDs.append(ids)
+            blockScores.append(scores)
+
+        bestIDs = numpy.vstack(blockIDs)
+        bestScores = numpy.vstack(blockScores)
+
+    order: ndarray = numpy.argsort(-bestScores, axis=1, kind="stable")
+    return (
+        numpy.take_along_axis(bestIDs, order, axis=1),
+        numpy.take_along_axis(bestScores, order, axis=1),
+    )
+
+
+def topSimilar(
+    queries: ndarray,
+    wv: KeyedVectors | EmbeddingStore,
+    topN: int = 10,
+    blockSize: int = 1 << 14,
+    queryBlockSize: int = 1024,
+) -> Tuple[ndarray, ndarray]:
+    """Returns the IDs and cosine similarities of the topN nearest vectors per query
+
+    The queries are normalised once and scored with blockedTopN().
+    """
+    queries = normalizeRows(numpy.atleast_2d(queries))
+
+    def scoreBlock(
+        block: ndarray, start: int, queryStart: int, queryStop: int
+    ) -> ndarray:
+        return queries[queryStart:queryStop] @ block.T
+
+    return blockedTopN(
+        wv=wv,
+        queryCount=queries.shape[0],
+        scoreBlock=scoreBlock,
+        topN=topN,
+        blockSize=blockSize,
+        queryBlockSize=queryBlockSize,
+    )
+
+
+def batchSimilarityQuery(
+    words: List[str], wv: KeyedVectors | EmbeddingStore, topN: int = 10
+) -> List[List[Tuple[str, float]]]:
+    """Returns the topN most similar words of every word with one pass over wv"""
+    ids, scores = topSimilar(queries=wv[words], wv=wv, topN=topN)
+    return [
+        [(wv.index_to_key[i], float(score)) for i, score in zip(rowIDs, rowScores)]
+        for rowIDs, rowScores in zip(ids, scores)
+    ]
+
+
 def similarityQuery(
-    word: str, wv: KeyedVectors, topN: int = 10
+    word: str,
+    wv: KeyedVectors | EmbeddingStore,
+    topN: int = 10,
+    index: IVFIndex | None = None,
 ) -> List[Tuple[str, float]]:
-    vector = wv[word]
-    return wv.most_similar([vector], topn=topN)
+    if index is None:
+        return batchSimilarityQuery(words=[word], wv=wv, topN=topN)[0]
+
+    ids, scores = index.search(wv[word], topN=topN)
+    return [(wv.index_to_key[i], float(score)) for i, score in zip(ids, scores)]
+
+
+def lookupIDs(wv: KeyedVectors | EmbeddingStore, words: List[str]) -> ndarray:
+    """Returns the ID of every word in wv, or -1 if a word is out of vocabulary"""
+    if isinstance(wv, EmbeddingStore):
+        return wv.index_to_key.lookup(words)
+    return numpy.array([wv.key_to_index.get(word, -1) for word in words], dtype=int64)
+
+
+def readWordPairs(filepath: str) -> Tuple[List[str], List[str], ndarray]:
+    """Returns the words and gold scores of a tab separated word pair file
+
+    Like gensim's evaluate_word_pairs(), lines starting with # and rows without
+    two words and a numeric score, such as a header, are skipped.
+    """
+    firstWords: List[str] = []
+    secondWords: List[str] = []
+    goldScores: List[float] = []
+
+    line: str
+    with open(file=filepath, mode="r") as pairFile:
+        for line in pairFile:
+            if line.startswith("#"):
+                continue
+
+            data: List[str] = line.strip().split(sep="\t")
+            if len(data) < 3:
+                continue
+
+            try:
+                score: float = float(data[2])
+            except ValueError:
+                continue
+
+            firstWords.append(data[0])
+            secondWords.append(data[1])
+            goldScores.append(score)
+        pairFile.close()
+
+    return (firstWords, secondWords, numpy.array(goldScores, dtype=float32))
+
+
+def evaluateWordPairs(
+    wv: KeyedVectors | EmbeddingStore, benchmarkPaths: List[str]
+) -> List[dict]:
+    """Returns the Spearman correlation and vocabulary coverage of each benchmark
+
+    The words of every benchmark are looked up and their vectors gathered and
+    normalised once, then each benchmark's cosine similarities are computed as
+    a single row-wise dot product. Pairs with an out of vocabulary word are
+    left out of the correlation and reported through the coverage instead.
+    """
+    benchmarks: List[Tuple[List[str], List[str], ndarray]] = [
+        readWordPairs(filepath=filepath) for filepath in benchmarkPaths
+    ]
+
+    words: List[str] = sorted(
+        {word for first, second, _ in benchmarks for word in first + second}
+    )
+    wordIDs: ndarray = lookupIDs(wv=wv, words=words)
+    known: ndarray = wordIDs >= 0
+
+    vectors: ndarray = numpy.zeros((len(words), wv.vectors.shape[1]), dtype=float32)
+    if known.any():
+        order: ndarray = numpy.argsort(wordIDs[known])
+        rows: ndarray = numpy.flatnonzero(known)[order]
+        vectors[rows] = normalizedVectors(wv, wordIDs[known][order])
+
+    results: List[dict] = []
+
+    filepath: str
+    for filepath, (firstWords, secondWords, goldScores) in zip(
+        benchmarkPaths, benchmarks
+    ):
+        first: ndarray = numpy.searchsorted(words, firstWords)
+        second: ndarray = numpy.searchsorted(words, secondWords)
+        covered: ndarray = known[first] & known[second]
+
+        similarities: ndarray = numpy.einsum(
+            "ij,ij->i", vectors[first[covered]], vectors[second[covered]]
+        )
+
+        spearmanScore: float = float("nan")
+        if covered.sum() > 1:
+            result: SignificanceResult = spearmanr(
+                a=goldScores[covered], b=similarities
+            )
+            spearmanScore = float(result.statistic)
+
+        results.append(
+            {
+                "benchmark": filepath,
+                "pairs": int(covered.shape[0]),
+                "covered": int(covered.sum()),
+                "coverage": float(covered.mean()) if covered.shape[0] else 0.0,
+                "spearman": spearmanScore,
+                "outOfVocabulary": sorted(
+                    {
+                        words[i]
+                        for i in numpy.concatenate([first, second])
+                        if not known[i]
+                    }
+                ),
+            }
+        )
+
+    return results
+
+
+def padIDs(idLists: List[ndarray]) -> ndarray:
+    """Returns the ID lists as the rows of a matrix, padded with -1"""
+    width: int = max([len(ids) for ids in idLists], default=0)
+    padded: ndarray = numpy.full((len(idLists), width), -1, dtype=int64)
+
+    row: int
+    ids: ndarray
+    for row, ids in enumerate(idLists):
+        padded[row, : len(ids)] = ids
+
+    return padded
+
+
+def solveAnalogies(
+    wv: KeyedVectors | EmbeddingStore,
+    positiveIDs: ndarray,
+    negativeIDs: ndarray,
+    method: str = "add",
+    topN: int = 1,
+    vocabularySize: int | None = None,
+    blockSize: int = 1 << 14,
+    queryBlockSize: int = 1024,
+) -> Tuple[ndarray, ndarray]:
+    """Returns the IDs and scores of the topN answers to each analogy
+
+    Row i of positiveIDs and negativeIDs holds the words added to and
+    subtracted from analogy i, padded with -1; "a is to b as c is to ?" is
+    positive [b, c] and negative [a]. method "add" ranks words by 3CosAdd, the
+    cosine similarity to the sum of the normalised positive vectors minus the
+    negative ones. method "mul" ranks them by 3CosMul, the product of their
+    shifted similarities to the positive words divided by the product of those
+    to the negative words. The input words of an analogy are never answers.
+    """
+    if method not in ("add", "mul"):
+        raise ValueError(f"Unsupported analogy method: {method}")
+
+    inputIDs: ndarray = numpy.hstack([positiveIDs, negativeIDs])
+    queryCount: int = inputIDs.shape[0]
+    positiveCount: int = positiveIDs.shape[1]
+
+    uniqueIDs: ndarray = numpy.unique(inputIDs[inputIDs >= 0])
+    inputVectors: ndarray = normalizedVectors(wv, uniqueIDs)
+    inputRows: ndarray = numpy.searchsorted(uniqueIDs, inputIDs)
+    signs: ndarray = numpy.where(
+        numpy.arange(inputIDs.shape[1]) < positiveCount, 1, -1
+    ).astype(float32)
+
+    queries: ndarray = numpy.zeros((queryCount, wv.vectors.shape[1]), dtype=float32)
+    if method == "add":
+        column: int
+        for column in range(inputIDs.shape[1]):
+            valid: ndarray = inputIDs[:, column] >= 0
+            queries[valid] += signs[column] * inputVectors[inputRows[valid, column]]
+        queries = normalizeRows(queries)
+
+    cachedWordScores: dict = {}
+
+    def scoreBlock(
+        block: ndarray, start: int, queryStart: int, queryStop: int
+    ) -> ndarray:
+        ids: ndarray = inputIDs[queryStart:queryStop]
+        scores: ndarray
+
+        if method == "add":
+            scores = queries[queryStart:queryStop] @ block.T
+        else:
+            if start not in cachedWordScores:
+                cachedWordScores.clear()
+                cachedWordScores[start] = (inputVectors @ block.T + 1) / 2
+            wordScores: ndarray = cachedWordScores[start]
+
+            scores = numpy.ones((ids.shape[0], block.shape[0]), dtype=float32)
+            for column in range(ids.shape[1]):
+                valid: ndarray = ids[:, column] >= 0
+                rows: ndarray = inputRows[queryStart:queryStop][valid, column]
+                if signs[column] > 0:
+                    scores[valid] *= wordScores[rows]
+                else:
+                    scores[valid] /= wordScores[rows] + 0.000001
+
+        local: ndarray = ids - start
+        inBlock: ndarray = (ids >= 0) & (local < block.shape[0]) & (local >= 0)
+        maskRows: ndarray = numpy.nonzero(inBlock)[0]
+        scores[maskRows, local[inBlock]] = -numpy.inf
+        return scores
+
+    return blockedTopN(
+        wv=wv,
+        queryCount=queryCount,
+        scoreBlock=scoreBlock,
+        topN=topN,
+        vocabularySize=vocabularySize,
+        blockSize=blockSize,
+        queryBlockSize=queryBlockSize,
+    )
+
+
+def readAnalogies(filepath: str) -> Tuple[List[str], List[List[str]], ndarray]:
+    """Returns the sections, questions, and question sections of an analogy file
+
+    The file uses the Google analogy test set format: ": section" lines start
+    a section, and every other line is a question "a b c d", read as "a is to b
+    as c is to d".
+    """
+    sections: List[str] = []
+    questions: List[List[str]] = []
+    questionSections: List[int] = []
+
+    line: str
+    with open(file=filepath, mode="r") as analogyFile:
+        for line in analogyFile:
+            if line.startswith(":"):
+                sections.append(line[1:].strip())
+                continue
+
+            words: List[str] = line.split()
+            if len(words) != 4:
+                continue
+
+            if len(sections) == 0:
+                sections.append("")
+            questions.append(words)
+            questionSections.append(len(sections) - 1)
+        analogyFile.close()
+
+    return (sections, questions, numpy.array(questionSections, dtype=int64))
+
+
+def evaluateAnalogies(
+    wv: KeyedVectors | EmbeddingStore,
+    filepath: str,
+    method: str = "add",
+    vocabularySize: int | None = 300000,
+) -> List[dict]:
+    """Returns the accuracy of wv on each section of an analogy file, then overall
+
+    Like gensim's evaluate_word_analogies(), answers are searched for among the
+    first vocabularySize words only, and questions with a word outside of them
+    are skipped and counted separately from the answered ones.
+    """
+    sections, questions, questionSections = readAnalogies(filepath=filepath)
+    limit: int = min(vocabularySize or len(wv), len(wv))
+
+    words: List[str] = sorted({word for question in questions for word in question})
+    wordIDs: ndarray = lookupIDs(wv=wv, words=words)
+    wordIDs[wordIDs >= limit] = -1
+
+    questionIDs: ndarray = wordIDs[
+        numpy.searchsorted(words, questions).reshape(-1, 4)
+        if len(questions) > 0
+        else numpy.empty((0, 4), dtype=int64)
+    ]
+    answered: ndarray = (questionIDs >= 0).all(axis=1)
+    correct: ndarray = numpy.zeros(len(questions), dtype=bool)
+
+    if answered.any():
+        answerable: ndarray = questionIDs[answered]
+        predictions, _ = solveAnalogies(
+            wv=wv,
+            positiveIDs=answerable[:, [1, 2]],
+            negativeIDs=answerable[:, [0]],
+            method=method,
+            vocabularySize=limit,
+        )
+        correct[answered] = predictions[:, 0] == answerable[:, 3]
+
+    results: List[dict] = []
+    section: int
+    for section in range(len(sections) + 1):
+        members: ndarray = (
+            questionSections == section
+            if section < len(sections)
+            else numpy.ones(len(questions), dtype=bool)
+        )
+        answeredCount: int = int((members & answered).sum())
+        correctCount: int = int((members & correct).sum())
+
+        results.append(
+            {
+                "section": sections[section] if section < len(sections) else "total",
+                "questions": int(members.sum()),
+                "answered": answeredCount,
+                "correct": correctCount,
+                "accuracy": correctCount / answeredCount if answeredCount else 0.0,
+            }
+        )
+
+    return results
 
 
 def downloadGoogleNews(
@@ -98,13 +1258,13 @@ def part1(model: KeyedVectors) -> None:
 
     print(f"Writing similarity test results to {outputFilePath}...")
 
-    testWord: str
-    with open(file=outputFilePath, mode="w") as sqr:
-        for testWord in testSimilarity:
-            similarWords: List[Tuple[str, float]] = similarityQuery(
-                word=testWord, wv=model
-            )
+    results: List[List[Tuple[str, float]]] = batchSimilarityQuery(
+        words=testSimilarity, wv=model
+    )
 
+    similarWords: List[Tuple[str, float]]
+    with open(file=outputFilePath, mode="w") as sqr:
+        for similarWords in results:
             similarWords: List[str] = [
                 ",".join([word, str(similarity)]) + "\n"
                 for word, similarity in similarWords
@@ -116,7 +1276,9 @@ def part1(model: KeyedVectors) -> None:
 
 
 def part2(
-    model: KeyedVectors, outputFilePath: str = "googleNewsSimilarityResults.txt"
+    model: KeyedVectors | EmbeddingStore,
+    outputFilePath: str = "googleNewsSimilarityResults.txt",
+    index: IVFIndex | None = None,
 ) -> None:
     testSimilarity: List[str] = [
         "human",
@@ -133,13 +1295,18 @@ def part2(
 
     print(f"Writing similarity test results to {outputFilePath}...")
 
-    testWord: str
-    with open(file=outputFilePath, mode="w") as sqr:
-        for testWord in testSimilarity:
-            similarWords: List[Tuple[str, float]] = similarityQuery(
-                word=testWord, wv=model, topN=100
-            )
+    results: List[List[Tuple[str, float]]]
+    if index is None:
+        results = batchSimilarityQuery(words=testSimilarity, wv=model, topN=100)
+    else:
+        results = [
+            similarityQuery(word=testWord, wv=model, topN=100, index=index)
+            for testWord in testSimilarity
+        ]
 
+    similarWords: List[Tuple[str, float]]
+    with open(file=outputFilePath, mode="w") as sqr:
+        for similarWords in results:
             similarWords: List[str] = [
                 ",".join([word, str(similarity)]) + "\n"
                 for word, similarity in similarWords
@@ -150,52 +1317,54 @@ def part2(
         sqr.close()
 
 
-def part3(model: KeyedVectors) -> float:
-    wordsimData: List[Tuple[str, str, float]] = []
-    googleNewsData: List[Tuple[str, str, float]] = []
+def part3(
+    model: KeyedVectors | EmbeddingStore,
+    benchmarkPaths: List[str] = [
+        "wordsim353_sim_rel/wordsim_similarity_goldstandard.txt",
+        "wordsim353_sim_rel/wordsim_relatedness_goldstandard.txt",
+    ],
+) -> List[dict]:
+    print("Evaluating word pair similarity on the Google News model...")
+    return evaluateWordPairs(wv=model, benchmarkPaths=benchmarkPaths)
 
-    wordsimPath: str = "wordsim353_sim_rel/wordsim_similarity_goldstandard.txt"
 
-    print("Reading wordsim file...")
-    line: str
-    for line in open(file=wordsimPath, mode="r"):
-        data: List[str] = line.strip().split(sep="\t")
-        foo: Tuple[str, str, float] = (data[0], data[1], float(data[2]))
-        wordsimData.append(foo)
-
-    print("Getting similarity of words from the Google News dataset...")
-    grouping: Tuple[str, str, float]
-    for grouping in wordsimData:
-        word1: str = grouping[0]
-        word2: str = grouping[1]
-        score: float = model.similarity(w1=word1, w2=word2)
-        googleNewsData.append((word1, word2, score))
-
-    wordsimScores: List[float] = [score for _, _, score in wordsimData]
-    googleNewsScores: List[float] = [score for _, _, score in googleNewsData]
-
-    spearmanScore: SignificanceResult = spearmanr(a=wordsimScores, b=googleNewsScores)
-
-    return spearmanScore.statistic
-
-
-def part4(model: KeyedVectors, outputFilePath: str = "analogiesResult.txt") -> None:
-    queries: List[float] = [
-        model["king"] - model["man"] + model["woman"],  # queen
-        model["king"] - model["country"],  # man
-        model["sky"] - model["sun"] + model["moon"],  # night
-        model["bicycle"] + model["engine"],  # motorcycle
-        model["dog"] + model["whiskers"] - model["fun"],  # cat
+def part4(
+    model: KeyedVectors | EmbeddingStore, outputFilePath: str = "analogiesResult.txt"
+) -> None:
+    positive: List[List[str]] = [
+        ["king", "woman"],  # queen
+        ["king"],  # man
+        ["sky", "moon"],  # night
+        ["bicycle", "engine"],  # motorcycle
+        ["dog", "whiskers"],  # cat
+    ]
+    negative: List[List[str]] = [
+        ["man"],
+        ["country"],
+        ["sun"],
+        [],
+        ["fun"],
     ]
 
-    query: float
-    with open(file=outputFilePath, mode="w") as ar:
-        for query in queries:
-            similarWords: List[Tuple[str, float]] = model.most_similar([query], topn=1)
+    word: str
+    for word in [word for words in positive + negative for word in words]:
+        if word not in model:
+            raise KeyError(f"Key '{word}' not present")
 
+    ids, scores = solveAnalogies(
+        wv=model,
+        positiveIDs=padIDs([lookupIDs(wv=model, words=words) for words in positive]),
+        negativeIDs=padIDs([lookupIDs(wv=model, words=words) for words in negative]),
+        topN=1,
+    )
+
+    rowIDs: ndarray
+    rowScores: ndarray
+    with open(file=outputFilePath, mode="w") as ar:
+        for rowIDs, rowScores in zip(ids, scores):
             similarWords: List[str] = [
-                ",".join([word, str(similarity)]) + "\n"
-                for word, similarity in similarWords
+                ",".join([model.index_to_key[i], str(float(similarity))]) + "\n"
+                for i, similarity in zip(rowIDs, rowScores)
             ]
 
             similarWords.append("\n")
@@ -206,24 +1375,85 @@ def part4(model: KeyedVectors, outputFilePath: str = "analogiesResult.txt") -> N
 def main() -> None:
     customModelFilePath: str = "models/w2v.gensim"
     googleNewsModelFilePath: str = "models/googleNews.keyedvectors.gensim"
+    googleNewsIndexPath: str = "models/googleNews.ivf"
+    googleNewsStorePath: str = "models/googleNews.store"
     args: Namespace = getArgs()
 
     if args.train:
-        train(customModelFilePath)
+        train(
+            modelFilePath=customModelFilePath,
+            vectorSize=args.vector_size,
+            window=args.window,
+            minCount=args.min_count,
+            epochs=args.epochs,
+            workers=args.workers,
+            skipGram=args.skip_gram,
+            checkpointDirectory=args.checkpoint_directory,
+            resume=args.resume,
+        )
         quit(1)
 
     if args.download_google_news:
         downloadGoogleNews(modelFilePath=googleNewsModelFilePath)
         quit(2)
 
-    customModel: KeyedVectors = Word2Vec.load(customModelFilePath).wv
-    googleNewsModel: KeyedVectors = KeyedVectors.load(googleNewsModelFilePath)
+    if args.build_index:
+        IVFIndex.build(
+            wv=KeyedVectors.load(googleNewsModelFilePath, mmap="r"),
+            directory=googleNewsIndexPath,
+            listCount=args.list_count,
+        )
+        quit(3)
+
+    if args.benchmark_index:
+        benchmarkIndex(
+            wv=KeyedVectors.load(googleNewsModelFilePath, mmap="r"),
+            index=IVFIndex.load(googleNewsIndexPath),
+        )
+        quit(4)
+
+    if args.build_store:
+        EmbeddingStore.build(
+            wv=KeyedVectors.load(googleNewsModelFilePath, mmap="r"),
+            directory=googleNewsStorePath,
+            dtype=args.store_dtype,
+        )
+        quit(5)
+
+    customModel: KeyedVectors = Word2Vec.load(customModelFilePath, mmap="r").wv
+    googleNewsModel: KeyedVectors | EmbeddingStore
+    if exists(googleNewsStorePath):
+        googleNewsModel = EmbeddingStore.load(googleNewsStorePath)
+    else:
+        googleNewsModel = KeyedVectors.load(googleNewsModelFilePath, mmap="r")
+    googleNewsIndex: IVFIndex | None = None
+    if exists(googleNewsIndexPath):
+        googleNewsIndex = IVFIndex.load(
+            googleNewsIndexPath, probeCount=args.probe_count
+        )
 
     part1(model=customModel)
-    part2(model=googleNewsModel)
-    print(f"Spearman Score: {part3(model=googleNewsModel)}")
+    part2(model=googleNewsModel, index=googleNewsIndex)
+    result: dict
+    for result in part3(model=googleNewsModel):
+        print(
+            f"{result['benchmark']}: Spearman Score: {result['spearman']}, "
+            f"coverage {result['covered']}/{result['pairs']} pairs"
+        )
+        if len(result["outOfVocabulary"]) > 0:
+            print(f"Out of vocabulary: {', '.join(result['outOfVocabulary'])}")
     part4(model=googleNewsModel)
 
+    print(f"Evaluating analogies from {args.analogies}...")
+    for result in evaluateAnalogies(
+        wv=googleNewsModel, filepath=args.analogies, method=args.analogy_method
+    ):
+        print(
+            f"{result['section']}: {result['correct']}/{result['answered']} "
+            f"correct ({result['accuracy']:.4f}), "
+            f"{result['questions'] - result['answered']} skipped"
+        )
+
 
 if __name__ == "__main__":
     main()